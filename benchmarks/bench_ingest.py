@@ -0,0 +1,62 @@
+import pytest
+from books.models import Book, Publisher
+from books.scrapers import OreillyBookScraper
+from .support import record_rate, scraped_books
+
+SIZES = [100, 10_000]
+
+
+@pytest.fixture
+def publisher(db):
+    return Publisher.objects.create(name="O'Reilly Media", slug='oreilly')
+
+
+def rounds_for(size):
+    return 20 if size <= 100 else 3
+
+
+@pytest.mark.benchmark(group='save_books')
+@pytest.mark.parametrize('size', SIZES)
+def test_save_new_books(benchmark, publisher, size):
+    scraper = OreillyBookScraper()
+    books = scraped_books(size)
+
+    def empty_catalog():
+        Book.objects.all().delete()
+        return (publisher, books), {}
+
+    new_books = benchmark.pedantic(scraper.save_books, setup=empty_catalog, rounds=rounds_for(size))
+    assert len(new_books) == size
+    record_rate(benchmark, size, 'record')
+
+
+@pytest.mark.benchmark(group='save_books')
+@pytest.mark.parametrize('size', SIZES)
+def test_save_unchanged_books(benchmark, publisher, size):
+    """A rescrape that finds nothing new: every record matches a stored book with the same content"""
+    scraper = OreillyBookScraper()
+    books = scraped_books(size)
+    scraper.save_books(publisher, books)
+
+    new_books = benchmark.pedantic(scraper.save_books, args=(publisher, books), rounds=rounds_for(size))
+    assert new_books == []
+    record_rate(benchmark, size, 'record')
+
+
+@pytest.mark.benchmark(group='save_books')
+@pytest.mark.parametrize('size', SIZES)
+def test_save_changed_books(benchmark, publisher, size):
+    """A rescrape where one book in ten has a new title or page count"""
+    scraper = OreillyBookScraper()
+    books = scraped_books(size)
+    scraper.save_books(publisher, books)
+    revisions = iter(range(1, 1_000_000))
+
+    def revise():
+        revision = next(revisions)
+        for book in books[::10]:
+            book['page_count'] = 200 + revision
+        return (publisher, books), {}
+
+    benchmark.pedantic(scraper.save_books, setup=revise, rounds=rounds_for(size))
+    record_rate(benchmark, size, 'record')
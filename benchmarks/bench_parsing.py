@@ -0,0 +1,64 @@
+import asyncio
+import io
+
+import pytest
+from books import parsing
+from books.models import Publisher
+from books.scrapers import ManningBookScraper, OreillyBookScraper, PacktBookScraper
+from books.streaming import iter_products
+from books.utils import publication_window
+from .support import RECORDED_ON, load_fixture, record_rate
+
+HTML_BACKENDS = [backend for backend in parsing.BACKENDS if parsing._installed(backend)]
+
+
+def parse_api_page(scraper, content):
+    window = publication_window(RECORDED_ON)
+    products = 0
+    for product in iter_products(io.BytesIO(content)):
+        products += 1
+        scraper._parse_product(product, scraper.extract_isbn_from_url(product.get('url', '')), *window)
+    return products
+
+
+@pytest.mark.benchmark(group='parse')
+def test_oreilly_api_page(benchmark):
+    scraper = OreillyBookScraper()
+    content = load_fixture('oreilly_search_page0.json')
+    products = benchmark(parse_api_page, scraper, content)
+    record_rate(benchmark, products, 'product')
+
+
+@pytest.mark.benchmark(group='parse')
+def test_oreilly_rss_feed(benchmark, fetcher):
+    scraper = OreillyBookScraper()
+    publisher = Publisher(name="O'Reilly Media", slug='oreilly')
+    books = benchmark(lambda: asyncio.run(
+        scraper._try_rss_fallback(publisher, None, fetcher.get_if_changed(scraper.rss_url))
+    ))
+    assert books
+    record_rate(benchmark, len(books), 'product')
+
+
+@pytest.mark.benchmark(group='parse')
+@pytest.mark.parametrize('backend', HTML_BACKENDS)
+@pytest.mark.parametrize('scraper_class', [ManningBookScraper, PacktBookScraper], ids=['manning', 'packt'])
+def test_catalog_html(benchmark, fetcher, settings, scraper_class, backend):
+    settings.BOOK_HTML_PARSER = backend
+    scraper = scraper_class()
+    publisher = Publisher(name=scraper_class.__name__, slug='benchmark')
+    books = benchmark(lambda: asyncio.run(scraper.aget_latest_books(publisher, limit=None, fetcher=fetcher)))
+    assert books
+    record_rate(benchmark, len(books), 'product')
+
+
+@pytest.mark.benchmark(group='crawl')
+@pytest.mark.django_db(transaction=True)
+def test_oreilly_api_crawl(benchmark, fetcher):
+    """Both recorded search pages end to end: crawl state, snapshots, streaming and filtering"""
+    publisher = Publisher.objects.create(name="O'Reilly Media", slug='oreilly')
+    scraper = OreillyBookScraper()
+    books = benchmark(lambda: asyncio.run(scraper.aget_latest_books(publisher, limit=None, fetcher=fetcher)))
+    assert books
+    products = sum(1 for page in (0, 1) for _ in iter_products(io.BytesIO(load_fixture(f'oreilly_search_page{page}.json'))))
+    record_rate(benchmark, products, 'product')
@@ -0,0 +1,69 @@
+import pytest
+from django.urls import reverse
+from books.models import Book, Publisher
+from books.pagination import ORDERING, encode_cursor
+from .support import create_catalog
+
+SIZES = [10_000, 100_000]
+
+
+@pytest.fixture(scope='module', params=SIZES, ids=lambda size: f'{size // 1000}k')
+def catalog(request, django_db_setup, django_db_blocker):
+    """Books shared by every view benchmark of one catalog size; generated once and removed afterwards"""
+    with django_db_blocker.unblock():
+        publishers = create_catalog(request.param)
+        # A cursor halfway through the catalog, to show that deep pages cost the same as the first one
+        middle = Book.objects.order_by(*ORDERING).values_list('publication_date', 'id')[request.param // 2]
+        yield {'publisher': publishers[0], 'middle_cursor': encode_cursor(middle)}
+        Book.objects.all().delete()
+        Publisher.objects.all().delete()
+
+
+@pytest.fixture
+def get(client, catalog, db):
+    def get(url, data=None):
+        response = client.get(url, data)
+        assert response.status_code == 200, response.status_code
+        return response
+    return get
+
+
+@pytest.mark.benchmark(group='api')
+def test_api_book_list(benchmark, get):
+    benchmark(get, reverse('books:book-list'))
+
+
+@pytest.mark.benchmark(group='api')
+def test_api_book_list_deep_page(benchmark, get, catalog):
+    benchmark(get, reverse('books:book-list'), {'cursor': catalog['middle_cursor']})
+
+
+@pytest.mark.benchmark(group='api')
+def test_api_book_list_by_publisher(benchmark, get, catalog):
+    benchmark(get, reverse('books:book-list'), {'publisher': catalog['publisher'].id})
+
+
+@pytest.mark.benchmark(group='api')
+def test_api_book_list_max_page_size(benchmark, get):
+    benchmark(get, reverse('books:book-list'), {'page_size': 200})
+
+
+@pytest.mark.benchmark(group='api')
+def test_api_book_detail(benchmark, get):
+    book_id = Book.objects.order_by('id').values_list('id', flat=True).last()
+    benchmark(get, reverse('books:book-detail', args=[book_id]))
+
+
+@pytest.mark.benchmark(group='html')
+def test_book_list_page(benchmark, get):
+    benchmark(get, reverse('books:book_list'))
+
+
+@pytest.mark.benchmark(group='html')
+def test_book_list_deep_page(benchmark, get, catalog):
+    benchmark(get, reverse('books:book_list'), {'cursor': catalog['middle_cursor']})
+
+
+@pytest.mark.benchmark(group='html')
+def test_book_list_search(benchmark, get):
+    benchmark(get, reverse('books:book_list'), {'q': 'benchmark book 4242'})
@@ -0,0 +1,28 @@
+import functools
+import logging
+
+import pytest
+from books import scrapers
+from books.utils import publication_window
+from .support import RECORDED_ON, RecordedFetcher
+
+
+@pytest.fixture(scope='session', autouse=True)
+def quiet_logging():
+    # Per-book INFO lines would otherwise measure the console and bookmonitor.log as much as the code
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(autouse=True)
+def offline_settings(settings, tmp_path, monkeypatch):
+    # Responses are measured uncached and snapshots are written to a throwaway directory
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    settings.BOOK_SNAPSHOT_DIR = tmp_path / 'snapshots'
+    monkeypatch.setattr(scrapers, 'publication_window', functools.partial(publication_window, RECORDED_ON))
+
+
+@pytest.fixture
+def fetcher():
+    return RecordedFetcher()
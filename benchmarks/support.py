@@ -0,0 +1,101 @@
+import functools
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import requests
+from books import scrapers
+from books.models import Book, Publisher
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# The fixtures were recorded on this day; publication dates are filtered against the window around it
+RECORDED_ON = date(2026, 10, 1)
+
+# URL (and O'Reilly search page) -> recorded response body
+RECORDINGS = {
+    (scrapers.OreillyBookScraper.api_url, 0): 'oreilly_search_page0.json',
+    (scrapers.OreillyBookScraper.api_url, 1): 'oreilly_search_page1.json',
+    (scrapers.OreillyBookScraper.rss_url, None): 'oreilly_feed.xml',
+    (scrapers.ManningBookScraper.base_url, None): 'manning_catalog.html',
+    (scrapers.PacktBookScraper.base_url, None): 'packt_catalog.html',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def load_fixture(name):
+    return (FIXTURES_DIR / name).read_bytes()
+
+
+def recorded_response(url, page=None):
+    """Builds a requests.Response from the recording of url, or a 404 when there is none"""
+    response = requests.Response()
+    response.url = url
+    response.encoding = 'utf-8'
+    name = RECORDINGS.get((url, page))
+    if name is None:
+        response.status_code = 404
+        response._content = b''
+    else:
+        response.status_code = 200
+        response._content = load_fixture(name)
+    return response
+
+
+class RecordedFetcher:
+    """Stands in for AsyncFetcher, answering from the recorded fixtures without touching the network"""
+
+    async def get(self, url, params=None, **kwargs):
+        return recorded_response(url, (params or {}).get('page'))
+
+    async def get_if_changed(self, url, **kwargs):
+        return recorded_response(url), None
+
+
+def scraped_books(count, offset=0):
+    """Book dicts shaped like the O'Reilly scraper output, ready for save_books"""
+    published = datetime.combine(RECORDED_ON, datetime.min.time()).replace(tzinfo=timezone.utc)
+    return [
+        {
+            'title': f'Benchmark book {i}',
+            'authors': f'Author {i % 500}, Coauthor {i % 37}',
+            'isbn': f'979{i:010d}',
+            'url': f'https://learning.oreilly.com/library/view/benchmark-book-{i}/979{i:010d}/',
+            'image_url': f'https://learning.oreilly.com/library/cover/979{i:010d}/250w/',
+            'publication_date': published - timedelta(days=i % 90),
+            'description': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 5,
+            'page_count': 200 + i % 400,
+        }
+        for i in range(offset, offset + count)
+    ]
+
+
+def create_catalog(rows, publishers=5, batch_size=2000):
+    """Bulk-creates rows books spread over a few publishers and returns the publishers"""
+    publishers = [Publisher.objects.create(name=f'Benchmark publisher {i}') for i in range(publishers)]
+    for start in range(0, rows, batch_size):
+        Book.objects.bulk_create([
+            Book(
+                publisher=publishers[i % len(publishers)],
+                title=data['title'],
+                author=data['authors'],
+                description=data['description'],
+                cover_url=data['image_url'],
+                book_url=data['url'],
+                publication_date=data['publication_date'].date(),
+                isbn=data['isbn'],
+                page_count=data['page_count'],
+            )
+            for i, data in enumerate(scraped_books(min(batch_size, rows - start), start), start)
+        ])
+    return publishers
+
+
+def record_rate(benchmark, items, name):
+    """Adds the per-item time and throughput of the last benchmark to the saved results"""
+    if benchmark.stats is None:
+        # --benchmark-disable runs each benchmark once without timing it
+        return
+    mean = benchmark.stats.stats.mean
+    benchmark.extra_info[name] = items
+    benchmark.extra_info[f'us_per_{name}'] = round(mean / items * 1e6, 2)
+    benchmark.extra_info[f'{name}_per_second'] = round(items / mean)
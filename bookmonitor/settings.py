@@ -42,6 +42,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so request metrics cover the whole middleware stack; unused without prometheus_client
+    'books.middleware.MetricsMiddleware',
+    'books.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -135,10 +138,14 @@ CELERY_TIMEZONE = TIME_ZONE
 # Cache Settings
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': 'redis://localhost:6379/1',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            # Serve from the database instead of failing requests while Redis is down
+            'IGNORE_EXCEPTIONS': True,
+            'SOCKET_CONNECT_TIMEOUT': 1,
+            'SOCKET_TIMEOUT': 1,
         }
     }
 }
@@ -174,3 +181,58 @@ LOGGING = {
         },
     },
 }
+
+# Scraper Settings
+BOOK_FETCH_TIMEOUT = 30
+BOOK_FETCH_PER_HOST_LIMIT = 4
+BOOK_FETCH_DEADLINE = 120
+BOOK_OREILLY_MAX_PAGES = 50
+BOOK_SNAPSHOT_DIR = BASE_DIR / 'snapshots'
+BOOK_HTML_PARSER = None  # 'selectolax', 'lxml' or 'html.parser'; the fastest installed one when None
+BOOK_HTTP_POOL_SIZE = 10
+BOOK_HTTP_RETRIES = 3
+BOOK_HTTP_BACKOFF = 0.5
+BOOK_HTTP_BACKOFF_JITTER = 0.5
+BOOK_HTTP_MAX_RETRY_AFTER = 60
+
+# Publisher origins the scrapers should fetch from instead, e.g. a stand-in started with
+# `python manage.py publisher_standin serve`, which prints the mapping to use:
+#   BOOK_SCRAPER_ORIGINS = {'https://www.oreilly.com': 'http://127.0.0.1:8800/www.oreilly.com'}
+BOOK_SCRAPER_ORIGINS = {}
+BOOK_STANDIN_DIR = BASE_DIR / 'standin'
+
+# Per-request SQL time goes to the Server-Timing header (with the slowest statements while DEBUG) and the
+# books.middleware log. Requests slower than BOOK_PROFILE_SLOW_MS are logged with their slowest statements
+# and the next request to the same route is profiled; BOOK_PROFILE_SAMPLE_RATE profiles a share of all requests.
+BOOK_PROFILE_SAMPLE_RATE = 0.0
+BOOK_PROFILE_SLOW_MS = 1000
+BOOK_PROFILE_SLOWEST_QUERIES = 3
+BOOK_PROFILE_DIR = BASE_DIR / 'profiles'
+BOOK_PROFILER = 'cprofile'  # or 'pyinstrument' if installed
+
+# Metrics are served at /metrics when prometheus_client is installed. Scrapes run in Celery workers, so
+# start the web and worker processes with the same PROMETHEUS_MULTIPROC_DIR (an empty directory, cleared
+# on restart) to expose the scraper, ingest and task metrics together with the view metrics.
+
+# API responses are cached per publisher generation; the timeout only bounds staleness if a bump is lost
+BOOK_API_CACHE_TIMEOUT = 60 * 15
+BOOK_EXPORT_CHUNK_SIZE = 2000
+
+# Requests per second and burst size per publisher host, shared by all workers through Redis
+BOOK_RATE_LIMIT_ENABLED = True
+BOOK_RATE_LIMIT_REDIS_URL = 'redis://localhost:6379/2'
+BOOK_RATE_LIMITS = {
+    'default': {'rate': 2, 'burst': 5},
+    'www.oreilly.com': {'rate': 1, 'burst': 3},
+    'www.manning.com': {'rate': 1, 'burst': 3},
+    'www.packtpub.com': {'rate': 1, 'burst': 3},
+}
+
+# Scraper tasks run on their own queue so a long scrape cannot starve other tasks.
+# Run a dedicated worker for it and size its concurrency to what the publishers tolerate:
+#   celery -A bookmonitor worker -Q scrapers --concurrency 4
+#   celery -A bookmonitor worker -Q celery
+CELERY_TASK_ROUTES = {
+    'books.tasks.update_books_for_publisher': {'queue': 'scrapers'},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
@@ -17,9 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
+from books.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('books/', include('books.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', RedirectView.as_view(pattern_name='books:book_list', permanent=False)),
 ]
@@ -4,8 +4,9 @@ from .models import Publisher, Book
 
 @admin.register(Publisher)
 class PublisherAdmin(admin.ModelAdmin):
-    list_display = ('name', 'website')
+    list_display = ('name', 'website', 'book_count', 'latest_publication_date')
     search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
 
 
 @admin.register(Book)
@@ -0,0 +1,71 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+ALL_PUBLISHERS = 'all'
+
+
+def _generation_key(scope):
+    return f"bookmonitor:generation:{scope}"
+
+
+def get_generations(scopes):
+    """Returns the current generation of each scope, starting missing ones from the clock"""
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # A counter lost to eviction restarts above any value it could have reached before,
+            # so responses cached under the old generation are never served again
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            generations[key] = cache.get(key, 0)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(publisher_ids):
+    """Moves the given publishers, and every response spanning all publishers, to a new generation"""
+    for scope in {*publisher_ids, ALL_PUBLISHERS}:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def invalidate_publishers(publisher_ids):
+    """Bumps the generations once the current transaction commits, so readers never cache pre-commit data"""
+    publisher_ids = set(publisher_ids)
+    if publisher_ids:
+        transaction.on_commit(lambda: bump_generations(publisher_ids))
+
+
+class CachedResponseMixin:
+    """Caches list and retrieve responses of a ViewSet under the generations of the publishers they cover"""
+
+    def get_cache_publishers(self, request, *args, **kwargs):
+        """Publisher ids the response depends on, or None when it spans all publishers"""
+        return None
+
+    def _cached(self, handler, request, *args, **kwargs):
+        publisher_ids = self.get_cache_publishers(request, *args, **kwargs)
+        generations = get_generations(publisher_ids or [ALL_PUBLISHERS])
+        url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+        key = f"bookmonitor:api:{self.basename}:{'.'.join(map(str, generations))}:{url}"
+
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'BOOK_API_CACHE_TIMEOUT', 900))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
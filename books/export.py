@@ -0,0 +1,77 @@
+import csv
+import datetime
+import json
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Book
+from .serializers import BookReadSerializer
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+BUFFER_SIZE = 64 * 1024
+
+
+def parse_since(value):
+    """Parses an ISO date or datetime; naive values are taken in the current time zone"""
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        since = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_rows(publisher_ids=None, since=None, chunk_size=None):
+    """Yields books in API format in the order they were added, reading chunk_size rows per database round trip"""
+    queryset = Book.objects.order_by('created_at', 'id').values(*BookReadSerializer.columns.values())
+    if publisher_ids:
+        queryset = queryset.filter(publisher_id__in=publisher_ids)
+    if since is not None:
+        queryset = queryset.filter(created_at__gt=since)
+
+    serializer = BookReadSerializer()
+    chunk_size = chunk_size or getattr(settings, 'BOOK_EXPORT_CHUNK_SIZE', 2000)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(row)
+
+
+class _Echo:
+    """File-like object handing back whatever csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(BookReadSerializer.columns)
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def iter_export(rows, export_format):
+    """Encodes rows as NDJSON or CSV, grouped into chunks of roughly BUFFER_SIZE bytes"""
+    lines = iter_ndjson(rows) if export_format == 'ndjson' else iter_csv(rows)
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import logging
+import time
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from . import metrics
+from .models import FetchValidator
+from .ratelimit import rate_limiter
+from .sessions import RETRY_STATUSES, get_session, retry_delay
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_DEADLINE = 120
+
+
+class FetchDeadlineExceeded(Exception):
+    """Raised when a request cannot finish before the fetcher deadline"""
+
+
+class AsyncFetcher:
+    """Runs blocking HTTP requests concurrently with a per-host limit and a shared deadline"""
+
+    def __init__(self, per_host_limit=None, deadline=None, timeout=None):
+        self.per_host_limit = per_host_limit or getattr(settings, 'BOOK_FETCH_PER_HOST_LIMIT', DEFAULT_PER_HOST_LIMIT)
+        self.deadline = deadline or getattr(settings, 'BOOK_FETCH_DEADLINE', DEFAULT_DEADLINE)
+        self.timeout = timeout or getattr(settings, 'BOOK_FETCH_TIMEOUT', DEFAULT_TIMEOUT)
+        self.started_at = time.monotonic()
+        self._semaphores = {}
+
+    def remaining(self):
+        return self.deadline - (time.monotonic() - self.started_at)
+
+    def _semaphore_for(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._semaphores[host]
+
+    async def get(self, url, **kwargs):
+        """Fetches url, retrying throttled and failing responses for as long as the deadline allows"""
+        retries = getattr(settings, 'BOOK_HTTP_RETRIES', 3)
+        attempt = 0
+        while True:
+            response = await self._send(url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+
+            delay = retry_delay(response, attempt)
+            if delay >= self.remaining():
+                return response
+            attempt += 1
+            logger.warning(f"{url} returned {response.status_code}, retry {attempt} of {retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _send(self, url, **kwargs):
+        """Sends one request once the rate limiter allows it"""
+        async with self._semaphore_for(url):
+            wait = await asyncio.to_thread(rate_limiter.reserve, url)
+            if wait and wait >= self.remaining():
+                # Nothing is sent, so the token goes back to the other requests for the host
+                await asyncio.to_thread(rate_limiter.release, url)
+                raise FetchDeadlineExceeded(f"Rate limit wait for {url} exceeds the deadline")
+            if wait:
+                await asyncio.sleep(wait)
+
+            remaining = self.remaining()
+            if remaining <= 0:
+                await asyncio.to_thread(rate_limiter.release, url)
+                raise FetchDeadlineExceeded(f"Deadline exceeded before fetching {url}")
+
+            kwargs['timeout'] = min(kwargs.get('timeout', self.timeout), remaining)
+            host = urlsplit(url).netloc
+            status = 'error'
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    asyncio.to_thread(get_session(url).get, url, **kwargs),
+                    timeout=remaining
+                )
+                status = response.status_code
+                metrics.HTTP_RESPONSE_BYTES.labels(host).inc(len(response.content))
+                return response
+            except asyncio.TimeoutError:
+                status = 'timeout'
+                raise FetchDeadlineExceeded(f"Deadline exceeded while fetching {url}")
+            finally:
+                metrics.HTTP_REQUEST_SECONDS.labels(host, status).observe(time.perf_counter() - started)
+
+    async def get_if_changed(self, url, **kwargs):
+        """Fetches url with its stored validators, returning (None, None) when the content has not changed"""
+        validator = await sync_to_async(FetchValidator.objects.filter(url=url).first)()
+        headers = dict(kwargs.pop('headers', None) or {})
+        if validator:
+            headers.update(validator.request_headers())
+
+        response = await self.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304:
+            logger.info(f"{url} not modified since last fetch")
+            return None, None
+        if response.status_code != 200:
+            return response, None
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if validator and validator.content_hash == content_hash:
+            logger.info(f"{url} content unchanged since last fetch")
+            return None, None
+
+        return response, {
+            'url': url,
+            'etag': response.headers.get('ETag', ''),
+            'last_modified': response.headers.get('Last-Modified', ''),
+            'content_hash': content_hash,
+        }
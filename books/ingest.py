@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import re
+import time
+from datetime import datetime
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import metrics
+from .cache import invalidate_publishers
+from .isbn import normalize_isbn
+from .models import Book, Publisher
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+# Publication dates are left out: Manning has none and reports the scrape date instead
+UPDATABLE_FIELDS = ['title', 'author', 'description', 'cover_url', 'page_count']
+
+
+def _max_length(name):
+    return Book._meta.get_field(name).max_length
+
+
+def book_fields(book_data):
+    """Maps a scraped record onto Book field values"""
+    publication_date = book_data.get('publication_date') or timezone.now().date()
+    if isinstance(publication_date, datetime):
+        publication_date = publication_date.date()
+
+    fields = {
+        'title': book_data.get('title', ''),
+        'author': book_data.get('authors', book_data.get('author', '')) or '',
+        'description': book_data.get('description', '') or '',
+        'cover_url': book_data.get('image_url', book_data.get('cover_url', '')) or '',
+        'book_url': book_data.get('url', book_data.get('book_url', '')) or '',
+        'publication_date': publication_date,
+        'isbn': book_data.get('isbn') or '',
+        'isbn13': normalize_isbn(book_data.get('isbn')),
+        'page_count': int(book_data.get('page_count') or 0),
+    }
+
+    # Values over max_length fail the whole batch on PostgreSQL: text is cut, values that cutting would break are dropped
+    for name in ('title', 'author'):
+        fields[name] = fields[name][:_max_length(name)]
+    for name in ('cover_url', 'isbn'):
+        if len(fields[name]) > _max_length(name):
+            fields[name] = ''
+    if len(fields['book_url']) > _max_length('book_url'):
+        raise ValueError(f"URL longer than {_max_length('book_url')} characters")
+    return fields
+
+
+def fingerprint(fields):
+    """Hashes the normalized updatable fields of a record"""
+    values = [re.sub(r'\s+', ' ', str(fields[name])).strip() for name in UPDATABLE_FIELDS]
+    return hashlib.sha256('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+def _apply_fields(book, fields):
+    changed = ['content_hash']
+    book.content_hash = fields['content_hash']
+    for name in UPDATABLE_FIELDS:
+        # Empty values mean the source did not provide the field, not that it was cleared
+        if fields[name]:
+            setattr(book, name, fields[name])
+            changed.append(name)
+    return changed
+
+
+def _isbn_key(isbn, isbn13):
+    """Matches on the normalized ISBN-13 when there is one, on the raw text otherwise"""
+    if isbn13:
+        return ('isbn13', isbn13)
+    if isbn:
+        return ('isbn', isbn)
+    return None
+
+
+def _ingest(publisher, records):
+    isbn13s = [fields['isbn13'] for fields in records if fields['isbn13']]
+    isbns = [fields['isbn'] for fields in records if fields['isbn'] and not fields['isbn13']]
+    urls = [fields['book_url'] for fields in records]
+
+    condition = Q(book_url__in=urls)
+    if isbn13s:
+        condition |= Q(isbn13__in=isbn13s)
+    if isbns:
+        condition |= Q(isbn__in=isbns)
+
+    by_isbn = {}
+    by_url = {}
+    existing_books = (
+        Book.objects.filter(condition)
+        .order_by()
+        .only('id', 'isbn', 'isbn13', 'book_url', 'content_hash')
+    )
+    for book in existing_books:
+        if book.isbn13:
+            by_isbn[('isbn13', book.isbn13)] = book
+        if book.isbn:
+            by_isbn[('isbn', book.isbn)] = book
+        by_url[book.book_url] = book
+
+    new_books = []
+    changed_books = []
+    # Books loaded with only() must not be written with fields they did not load, or bulk_update
+    # fetches each missing one with a query per book, so updates are grouped by the fields they set
+    changed_groups = {}
+    for fields in records:
+        existing_book = by_isbn.get(_isbn_key(fields['isbn'], fields['isbn13']))
+        existing_book = existing_book or by_url.get(fields['book_url'])
+
+        if existing_book:
+            if existing_book.content_hash != fields['content_hash']:
+                changed_groups.setdefault(tuple(_apply_fields(existing_book, fields)), []).append(existing_book)
+                changed_books.append(existing_book)
+            continue
+
+        new_books.append(Book(publisher=publisher, **fields))
+
+    if not new_books and not changed_books:
+        return new_books, changed_books
+
+    with transaction.atomic():
+        Book.objects.bulk_create(new_books, batch_size=BATCH_SIZE)
+        if new_books:
+            Publisher.objects.books_added(
+                publisher.id, len(new_books), max(book.publication_date for book in new_books)
+            )
+        for changed_fields, books in changed_groups.items():
+            Book.objects.bulk_update(books, changed_fields, batch_size=BATCH_SIZE)
+        invalidate_publishers([publisher.id])
+
+    return new_books, changed_books
+
+
+def _ingest_each(publisher, records):
+    """Saves records one at a time, skipping those the database rejects"""
+    new_books, changed_books, failed = [], [], 0
+    for fields in records:
+        try:
+            new, changed = _ingest(publisher, [fields])
+        except DatabaseError as e:
+            logger.error(f"Error saving book {fields['title']}: {e}")
+            failed += 1
+            continue
+        new_books += new
+        changed_books += changed
+    return new_books, changed_books, failed
+
+
+def ingest_books(publisher, books_data):
+    """Inserts new books and updates changed ones in a single transaction, returning the new books"""
+    started = time.perf_counter()
+    records = []
+    seen = set()
+    skipped = 0
+    for book_data in books_data:
+        try:
+            fields = book_fields(book_data)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Error preparing book {book_data.get('title', 'Unknown')}: {e}")
+            skipped += 1
+            continue
+
+        if not fields['book_url']:
+            logger.warning(f"Skipping book without URL: {fields['title']}")
+            skipped += 1
+            continue
+
+        fields['content_hash'] = fingerprint(fields)
+
+        keys = {_isbn_key(fields['isbn'], fields['isbn13']), ('url', fields['book_url'])} - {None}
+        if keys & seen:
+            skipped += 1
+            continue
+        seen.update(keys)
+        records.append(fields)
+
+    metrics.INGEST_ROWS.labels(publisher.slug, 'skipped').inc(skipped)
+    if not records:
+        return []
+
+    queries = metrics.QueryTimer()
+    failed = 0
+    with connection.execute_wrapper(queries):
+        try:
+            try:
+                new_books, changed_books = _ingest(publisher, records)
+            except IntegrityError as e:
+                # Another worker inserted some of these books in the meantime, so match them again
+                logger.warning(f"Conflict while saving books for {publisher.name}, retrying: {e}")
+                new_books, changed_books = _ingest(publisher, records)
+        except DatabaseError as e:
+            # A record the database rejects must not cost the rest of the batch
+            logger.error(f"Error saving books for {publisher.name}, saving them one at a time: {e}")
+            new_books, changed_books, failed = _ingest_each(publisher, records)
+
+    metrics.INGEST_ROWS.labels(publisher.slug, 'skipped').inc(failed)
+    metrics.INGEST_ROWS.labels(publisher.slug, 'inserted').inc(len(new_books))
+    metrics.INGEST_ROWS.labels(publisher.slug, 'updated').inc(len(changed_books))
+    metrics.INGEST_ROWS.labels(publisher.slug, 'unchanged').inc(
+        len(records) - len(new_books) - len(changed_books) - failed
+    )
+    metrics.INGEST_DB_SECONDS.labels(publisher.slug).observe(queries.seconds)
+    metrics.INGEST_SECONDS.labels(publisher.slug).observe(time.perf_counter() - started)
+
+    for book in new_books:
+        logger.info(f"Added new book: {book.title}")
+    if changed_books:
+        logger.info(f"Updated {len(changed_books)} existing books from {publisher.name}")
+
+    return new_books
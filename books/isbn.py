@@ -0,0 +1,66 @@
+import re
+
+
+def _isbn13_check_digit(digits):
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def _isbn10_check_digit(digits):
+    total = sum(int(digit) * (10 - i) for i, digit in enumerate(digits[:9]))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+def normalize_isbn(value):
+    """Returns the ISBN-13 of an ISBN-10 or ISBN-13 in any notation as an integer, or None if it is not valid"""
+    if not value:
+        return None
+
+    digits = re.sub(r'[^0-9X]', '', str(value).upper())
+    if len(digits) == 10 and digits[:9].isdigit() and _isbn10_check_digit(digits) == digits[9]:
+        digits = '978' + digits[:9]
+        return int(digits + _isbn13_check_digit(digits))
+    if len(digits) == 13 and digits.isdigit() and digits[:3] in ('978', '979') and _isbn13_check_digit(digits) == digits[12]:
+        return int(digits)
+    return None
+
+
+def backfill_isbn13(book_model, batch_size=1000):
+    """Fills isbn13 for books that have none and returns (updated, [(duplicate id, owner id), ...])"""
+    # A book whose ISBN normalizes to one another book already holds stays without isbn13,
+    # so the unique constraint always holds and the duplicate can be reviewed or deleted
+    updated = 0
+    duplicates = []
+    last_id = 0
+    while True:
+        batch = list(
+            book_model.objects.filter(id__gt=last_id, isbn13__isnull=True)
+            .exclude(isbn='')
+            .order_by('id')
+            .only('id', 'isbn')[:batch_size]
+        )
+        if not batch:
+            return updated, duplicates
+        last_id = batch[-1].id
+
+        normalized = {book.id: normalize_isbn(book.isbn) for book in batch}
+        owners = dict(
+            book_model.objects.filter(isbn13__in={value for value in normalized.values() if value})
+            .values_list('isbn13', 'id')
+        )
+
+        changed = []
+        for book in batch:
+            isbn13 = normalized[book.id]
+            if isbn13 is None:
+                continue
+            if isbn13 in owners:
+                duplicates.append((book.id, owners[isbn13]))
+                continue
+            owners[isbn13] = book.id
+            book.isbn13 = isbn13
+            changed.append(book)
+
+        book_model.objects.bulk_update(changed, ['isbn13'])
+        updated += len(changed)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from books.isbn import backfill_isbn13
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Fills the normalized ISBN-13 of books that have none and reports books sharing one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Books updated per query')
+        parser.add_argument('--delete-duplicates', action='store_true', help='Delete books whose ISBN another book already holds')
+
+    def handle(self, *args, **options):
+        updated, duplicates = backfill_isbn13(Book, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Normalized the ISBN of {updated} books'))
+
+        if not duplicates:
+            return
+
+        self.stdout.write(self.style.WARNING(f'{len(duplicates)} books share an ISBN with another book:'))
+        books = Book.objects.in_bulk([book_id for pair in duplicates for book_id in pair])
+        for duplicate_id, owner_id in duplicates:
+            duplicate, owner = books[duplicate_id], books[owner_id]
+            self.stdout.write(f'  • {duplicate.id} "{duplicate.title}" ({duplicate.isbn}) duplicates {owner.id} "{owner.title}" ({owner.isbn})')
+
+        if options['delete_duplicates']:
+            deleted, _ = Book.objects.filter(id__in=[duplicate_id for duplicate_id, _ in duplicates]).delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} duplicate books'))
@@ -0,0 +1,75 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from books.models import Book, Publisher
+from books.serializers import BookReadSerializer, BookSerializer
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def read_paths():
+    return [
+        ('ModelSerializer, lazy publisher', lambda: BookSerializer(Book.objects.order_by('-publication_date'), many=True).data),
+        ('ModelSerializer, select_related', lambda: BookSerializer(
+            Book.objects.select_related('publisher').order_by('-publication_date'), many=True).data),
+        ('values() + BookReadSerializer', lambda: BookReadSerializer(
+            Book.objects.order_by('-publication_date').values(*BookReadSerializer.columns.values()), many=True).data),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Measures queries and serialization time of the book API read paths on generated books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, action='append', help='Books to generate per run (repeatable); 1000 and 10000 by default')
+        parser.add_argument('--publishers', type=int, default=5, help='Publishers the generated books are spread over')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per read path')
+
+    def handle(self, *args, **options):
+        for rows in options['rows'] or [1000, 10000]:
+            # Everything is generated inside a transaction that is rolled back afterwards
+            with transaction.atomic():
+                self.generate(rows, options['publishers'])
+                self.stdout.write(f'\n{rows} books:')
+                self.measure(options['repeat'])
+                transaction.set_rollback(True)
+
+    def generate(self, rows, publishers):
+        publishers = [Publisher.objects.create(name=f'Benchmark publisher {i}') for i in range(publishers)]
+        today = date.today()
+        Book.objects.bulk_create([
+            Book(
+                publisher=publishers[i % len(publishers)],
+                title=f'Benchmark book {i}',
+                author=f'Author {i}',
+                description='Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 5,
+                cover_url=f'https://example.com/covers/{i}.jpg',
+                book_url=f'https://example.com/benchmark/{i}',
+                publication_date=today - timedelta(days=i % 90),
+                isbn=f'979{i:010d}',
+                page_count=300,
+            )
+            for i in range(rows)
+        ], batch_size=1000)
+
+    def measure(self, repeat):
+        for name, read in read_paths():
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                read()
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                read()
+                timings.append(time.perf_counter() - started)
+
+            self.stdout.write(f'  {name:<34} {queries.count:>6} queries  {min(timings) * 1000:9.1f} ms')
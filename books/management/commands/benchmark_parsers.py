@@ -0,0 +1,101 @@
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+from books.parsing import BACKENDS, _installed, select_containers
+
+PAGE_CHROME = '''
+<head>
+  <title>Catalog</title>
+  <style>{styles}</style>
+  <script>{script}</script>
+</head>
+<body>
+  <nav>{nav}</nav>
+  <main>{products}</main>
+  <footer>{footer}</footer>
+</body>
+'''
+
+
+def synthetic_page(container_class, products):
+    """Builds a catalog page with site chrome around `products` items in the layout the scrapers expect"""
+    if container_class == 'book-item':
+        item = (
+            '<div class="book-item"><a href="/books/book-{i}"><img src="/covers/{i}.jpg" alt="">'
+            '<span class="book-title">Book {i} in Action</span></a>'
+            '<div class="book-authors">Author {i}, Coauthor {i}</div>'
+            '<p class="blurb">{blurb}</p></div>'
+        )
+    else:
+        item = (
+            '<div class="product-item"><img src="https://static.example.com/{i}.png" alt="">'
+            '<a class="product-item-link" href="https://www.packtpub.com/product/book-{i}/978180{i:07d}">Book {i}</a>'
+            '<div class="authors">Author {i}</div><div class="publication-date">March 2026</div>'
+            '<p class="blurb">{blurb}</p></div>'
+        )
+
+    blurb = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4
+    return '<!DOCTYPE html><html>' + PAGE_CHROME.format(
+        styles='.x{color:red}' * 2000,
+        script='var config = {"key": "value"};' * 2000,
+        nav=''.join(f'<li><a href="/category/{i}">Category {i}</a></li>' for i in range(400)),
+        products=''.join(item.format(i=i, blurb=blurb) for i in range(products)),
+        footer=''.join(f'<p><a href="/page/{i}">Footer link {i}</a></p>' for i in range(300)),
+    ) + '</html>'
+
+
+def full_tree(html, container_class):
+    return BeautifulSoup(html, 'html.parser').select(f'.{container_class}')
+
+
+class Command(BaseCommand):
+    help = 'Compares HTML parser backends on recorded or synthetic Manning and Packt catalog pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--manning', help='Recorded Manning catalog page')
+        parser.add_argument('--packt', help='Recorded Packt all-books page')
+        parser.add_argument('--products', type=int, default=500, help='Products per synthetic page')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per backend')
+
+    def handle(self, *args, **options):
+        pages = []
+        for name, container_class in (('manning', 'book-item'), ('packt', 'product-item')):
+            if options[name]:
+                with open(options[name], encoding='utf-8') as f:
+                    pages.append((options[name], container_class, f.read()))
+            else:
+                pages.append((f'synthetic {name}', container_class, synthetic_page(container_class, options['products'])))
+
+        candidates = [('html.parser (full tree)', lambda html, cls: full_tree(html, cls))]
+        for backend in BACKENDS:
+            if _installed(backend):
+                candidates.append((backend, lambda html, cls, backend=backend: select_containers(html, cls, backend)))
+
+        self.stdout.write('Peak memory is traced Python allocations; selectolax parses in C, so its tree is not counted')
+
+        for label, container_class, html in pages:
+            self.stdout.write(f'\n{label}: {len(html) / 1024:.0f} KiB')
+            baseline = None
+
+            for name, parse in candidates:
+                found = len(parse(html, container_class))
+
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    parse(html, container_class)
+                    timings.append(time.perf_counter() - started)
+                best = min(timings)
+
+                tracemalloc.start()
+                parse(html, container_class)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                baseline = baseline or (best, peak)
+                self.stdout.write(
+                    f'  {name:<24} {found:>5} items  {best * 1000:8.1f} ms  '
+                    f'{peak / 1024 / 1024:7.1f} MiB peak  '
+                    f'x{baseline[0] / best:5.1f} faster  x{baseline[1] / max(peak, 1):5.1f} less memory'
+                )
@@ -0,0 +1,35 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from books.export import FORMATS, export_rows, iter_export, parse_since
+
+
+class Command(BaseCommand):
+    help = 'Streams the book catalog as NDJSON or CSV to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson', help='Output format')
+        parser.add_argument('--publisher', type=int, action='append', help='Publisher id to export (repeatable); all publishers by default')
+        parser.add_argument('--since', help='Only books added after this ISO date or datetime, for incremental syncs')
+        parser.add_argument('--output', help='File to write to; stdout by default')
+        parser.add_argument('--chunk-size', type=int, help='Rows read per database round trip')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_since(options['since'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        rows = export_rows(options['publisher'], since, options['chunk_size'])
+        chunks = iter_export(rows, options['format'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exported books to {options['output']}"))
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
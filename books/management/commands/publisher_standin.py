@@ -0,0 +1,68 @@
+from pprint import pformat
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from books.standin import RecordingStore, StandinServer, origin_overrides, scraper_origins
+
+# To load test the fetch-to-ingest path against a replay, point the scrapers at the stand-in with the
+# BOOK_SCRAPER_ORIGINS this command prints. All publishers then share the stand-in host, so give it an entry
+# in BOOK_RATE_LIMITS (or disable rate limiting), and raise BOOK_OREILLY_MAX_PAGES and BOOK_FETCH_DEADLINE
+# for scaled catalogs.
+
+
+class Command(BaseCommand):
+    help = 'Runs a local publisher stand-in that records real responses or replays them with latency, errors and a scaled catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('mode', choices=['record', 'serve'], help='record forwards requests to the publishers and saves the responses; serve replays them')
+        parser.add_argument('--bind', default='127.0.0.1', help='Address to listen on')
+        parser.add_argument('--port', type=int, default=8800, help='Port to listen on')
+        parser.add_argument('--dir', default=None, help='Recordings directory (BOOK_STANDIN_DIR by default)')
+        parser.add_argument('--latency', type=float, default=0, help='Mean response delay in milliseconds')
+        parser.add_argument('--jitter', type=float, default=0, help='Random variation of the delay in milliseconds')
+        parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered with 503')
+        parser.add_argument('--throttle-rate', type=float, default=0, help='Share of requests answered with 429')
+        parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429 responses')
+        parser.add_argument('--scale', type=int, default=1, help='Multiplies the products of recorded paginated search results')
+        parser.add_argument('--no-shift-dates', action='store_true', help='Replay dates as recorded instead of moving them to today')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible latency and errors')
+
+    def handle(self, *args, **options):
+        store = RecordingStore(options['dir'] or getattr(settings, 'BOOK_STANDIN_DIR', settings.BASE_DIR / 'standin'))
+        record = options['mode'] == 'record'
+
+        server = StandinServer(
+            (options['bind'], options['port']),
+            store,
+            record=record,
+            latency=options['latency'] / 1000,
+            jitter=options['jitter'] / 1000,
+            error_rate=options['error_rate'],
+            throttle_rate=options['throttle_rate'],
+            retry_after=options['retry_after'],
+            scale=max(1, options['scale']),
+            shift_dates=not options['no_shift_dates'],
+            seed=options['seed'],
+        )
+        address = f"{options['bind']}:{server.server_address[1]}"
+
+        if record:
+            self.stdout.write(f'Recording into {store.directory}')
+            origins = scraper_origins()
+        else:
+            if not server.recordings:
+                self.stdout.write(self.style.WARNING(f'No recordings in {store.directory}; run with "record" first'))
+            self.stdout.write(f'Replaying {len(server.recordings)} recordings from {store.directory}')
+            for (host, path, _), catalog in server.catalogs.items():
+                self.stdout.write(f'  {host}{path}: {len(catalog.products)} products in pages of {catalog.page_size}')
+            origins = [f'https://{host}' for host in server.hosts] or scraper_origins()
+
+        self.stdout.write(f'Listening on http://{address}/ - point the scrapers at it with:')
+        self.stdout.write(f'BOOK_SCRAPER_ORIGINS = {pformat(origin_overrides(address, origins))}')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(self.style.SUCCESS('Stand-in stopped'))
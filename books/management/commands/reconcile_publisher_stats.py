@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from books.models import Publisher
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored book count and latest publication date of every publisher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the publishers that drifted')
+
+    def handle(self, *args, **options):
+        before = {publisher.id: publisher for publisher in Publisher.objects.all()}
+
+        with transaction.atomic():
+            drifted = Publisher.objects.reconcile()
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Publisher statistics are up to date.'))
+            return
+
+        for publisher in drifted:
+            old = before[publisher.id]
+            self.stdout.write(
+                f'  • {publisher.name}: {old.book_count} -> {publisher.book_count} books, '
+                f'latest {old.latest_publication_date} -> {publisher.latest_publication_date}'
+            )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run, {len(drifted)} publishers would be corrected.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Corrected {len(drifted)} publishers.'))
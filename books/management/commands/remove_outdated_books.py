@@ -1,89 +1,76 @@
 import logging
-from datetime import datetime
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
 from books.models import Book, Publisher
+from books.utils import MIN_PAGE_COUNT, publication_window
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'Removes books that do not meet criteria (publication date and page count)'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--publisher',
+            action='append',
+            help='Publisher id or name fragment to restrict the cleanup to (repeatable); all publishers by default',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the books that would be deleted')
+        parser.add_argument('--yes', action='store_true', help='Delete without asking for confirmation')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Books deleted per transaction')
+
     def handle(self, *args, **options):
         self.stdout.write('Starting removal of outdated books...')
 
-        current_date = datetime.now(timezone.utc).date()
-
-        one_month_future = current_date.replace(month=current_date.month+1) if current_date.month < 12 else current_date.replace(year=current_date.year+1, month=1)
-        three_months_past = current_date
+        three_months_past, one_month_future = publication_window()
+        self.stdout.write(f'Checking books with publication date outside range {three_months_past} - {one_month_future} or with a known page count < {MIN_PAGE_COUNT}')
 
-        for _ in range(3):
-            month = three_months_past.month - 1
-            year = three_months_past.year
-            if month == 0:
-                month = 12
-                year -= 1
-            three_months_past = three_months_past.replace(year=year, month=month)
+        books = Book.objects.outdated()
 
-        self.stdout.write(f'Checking books with publication date outside range {three_months_past} - {one_month_future} or with page count < 200')
+        if options['publisher']:
+            publishers = Publisher.objects.none()
+            for value in options['publisher']:
+                if value.isdigit():
+                    publishers |= Publisher.objects.filter(id=value)
+                else:
+                    publishers |= Publisher.objects.filter(name__icontains=value)
 
-        publishers = Publisher.objects.filter(name__contains="O'Reilly")
-        if not publishers:
-            self.stdout.write(self.style.WARNING('No publishers found with name containing O\'Reilly'))
-            return
+            if not publishers.exists():
+                self.stdout.write(self.style.WARNING('No matching publishers found'))
+                return
 
-        self.stdout.write(f'Found {publishers.count()} publishers with name containing O\'Reilly:')
-        for publisher in publishers:
-            self.stdout.write(f'  • ID: {publisher.id}, Name: {publisher.name}')
+            for publisher in publishers:
+                self.stdout.write(f'  • ID: {publisher.id}, Name: {publisher.name}')
+            books = books.filter(publisher__in=publishers)
 
-        oreilly_books = Book.objects.filter(publisher__in=publishers)
-        total_books = oreilly_books.count()
+        out_of_window = Q(publication_date__lt=three_months_past) | Q(publication_date__gt=one_month_future)
+        counts = books.aggregate(
+            total=Count('id'),
+            by_date=Count('id', filter=out_of_window),
+            by_pages=Count('id', filter=~out_of_window & Q(page_count__gt=0, page_count__lt=MIN_PAGE_COUNT)),
+        )
 
-        if total_books == 0:
-            self.stdout.write(self.style.WARNING('No O\'Reilly books found'))
+        if counts['total'] == 0:
+            self.stdout.write(self.style.SUCCESS('All books meet the criteria, no deletion required.'))
             return
 
-        self.stdout.write(f'Found {total_books} O\'Reilly books')
-
-        deleted_date_count = 0
-        deleted_pages_count = 0
-        books_to_delete = []
+        self.stdout.write(self.style.WARNING(f'Will delete {counts["total"]} books:'))
+        self.stdout.write(f'  - Due to date mismatch: {counts["by_date"]}')
+        self.stdout.write(f'  - Due to low page count: {counts["by_pages"]}')
 
-        for book in oreilly_books:
-            pub_date = book.publication_date
-            if isinstance(pub_date, datetime):
-                pub_date = pub_date.date()
-            delete_reason = None
-
-            if pub_date < three_months_past or pub_date > one_month_future:
-                delete_reason = f"publication date ({pub_date}) outside range {three_months_past} - {one_month_future}"
-                deleted_date_count += 1
-                books_to_delete.append((book, delete_reason))
-                continue
-
-            if book.page_count < 200:
-                delete_reason = f"page count ({book.page_count}) less than 200"
-                deleted_pages_count += 1
-                books_to_delete.append((book, delete_reason))
-                continue
+        if options['dry_run']:
+            self.stdout.write('Dry run, nothing deleted.')
+            return
 
-        if books_to_delete:
-            self.stdout.write(self.style.WARNING(f'Will delete {len(books_to_delete)} books:'))
-            for book, reason in books_to_delete:
-                self.stdout.write(f'  • {book.title} - {book.author} - reason: {reason}')
+        if not options['yes']:
+            if not sys.stdin.isatty():
+                raise CommandError('Refusing to delete without confirmation, pass --yes to run non-interactively')
 
             confirmation = input('Are you sure you want to delete these books? (y/n): ')
             if confirmation.lower() != 'y':
                 self.stdout.write(self.style.WARNING('Operation cancelled.'))
                 return
 
-            for book, _ in books_to_delete:
-                book_title = book.title
-                book.delete()
-                self.stdout.write(f'Deleted book: {book_title}')
-
-            self.stdout.write(self.style.SUCCESS(f'Successfully deleted {len(books_to_delete)} books'))
-            self.stdout.write(f'  - Due to date mismatch: {deleted_date_count}')
-            self.stdout.write(f'  - Due to low page count: {deleted_pages_count}')
-        else:
-            self.stdout.write(self.style.SUCCESS('All books meet the criteria, no deletion required.'))
\ No newline at end of file
+        deleted = books.delete_in_batches(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully deleted {deleted} books'))
@@ -1,7 +1,7 @@
-import json
 import logging
 from django.core.management.base import BaseCommand
 from books.models import Book, Publisher
+from books.snapshots import find_snapshots, iter_snapshot_products
 import re
 
 logger = logging.getLogger(__name__)
@@ -9,10 +9,16 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Updates page count information for O\'Reilly books'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--snapshot',
+            help='Hash (or hash prefix) of a single API snapshot to replay; all snapshots are read by default',
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Starting update of page count information for O\'Reilly books...')
 
-        publisher = Publisher.objects.filter(name__contains="O'Reilly").first()
+        publisher = Publisher.objects.filter(slug='oreilly').first()
         if not publisher:
             self.stdout.write(self.style.ERROR('O\'Reilly publisher not found'))
             return
@@ -27,15 +33,15 @@ class Command(BaseCommand):
         self.stdout.write(f'Found {total_books} O\'Reilly books without page count information')
 
         try:
-            with open('oreilly_api_response.json', 'r', encoding='utf-8') as f:
-                api_data = json.load(f)
-
-            if not api_data or 'data' not in api_data or 'products' not in api_data['data']:
-                self.stdout.write(self.style.ERROR('No book data found in API response file'))
+            snapshots = find_snapshots([publisher], options['snapshot'])
+            if not snapshots.exists():
+                self.stdout.write(self.style.ERROR('No API snapshots found'))
                 return
 
+            self.stdout.write(f'Reading {snapshots.count()} API snapshots')
+
             page_count_data = {}
-            for product in api_data['data']['products']:
+            for product in iter_snapshot_products(snapshots):
                 if product.get('type') != 'book':
                     continue
 
@@ -46,7 +52,8 @@ class Command(BaseCommand):
                     if matches:
                         isbn = matches[0]
 
-                if not isbn:
+                # Snapshots are read newest first, so keep the most recent data for each book
+                if not isbn or isbn in page_count_data:
                     continue
 
                 page_count = product.get('custom_attributes', {}).get('page_count', 0)
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from books.models import Publisher
-from books.scrapers import get_scraper_for_publisher
+from books.registry import get_scraper_for_publisher
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,16 +11,16 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         try:
-            publisher = Publisher.objects.get(name="O'Reilly Media")
+            publisher = Publisher.objects.get(slug='oreilly')
 
             scraper = get_scraper_for_publisher(publisher)
 
             if scraper:
                 self.stdout.write(self.style.SUCCESS(f'Starting update of {publisher.name} books...'))
-                books_data = scraper.get_latest_books(limit=20)
+                books_data = scraper.get_latest_books(publisher, limit=None)
 
                 if books_data:
-                    new_books = scraper.save_books(books_data)
+                    new_books = scraper.save_books(publisher, books_data)
                     self.stdout.write(self.style.SUCCESS(f'Added {len(new_books)} new {publisher.name} books'))
 
                     if new_books:
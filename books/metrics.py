@@ -0,0 +1,101 @@
+import os
+import time
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TASK_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+class _NoopMetric:
+    """Stands in for every metric when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def _metric(kind, name, documentation, labelnames, **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labelnames, **kwargs)
+
+
+HTTP_REQUEST_SECONDS = _metric(
+    'Histogram', 'bookmonitor_http_request_duration_seconds',
+    'Publisher HTTP request latency, one observation per attempt', ['host', 'status'], buckets=LATENCY_BUCKETS,
+)
+HTTP_RESPONSE_BYTES = _metric(
+    'Counter', 'bookmonitor_http_response_bytes', 'Response body bytes received from publisher hosts', ['host'],
+)
+PARSE_SECONDS = _metric(
+    'Histogram', 'bookmonitor_parse_duration_seconds',
+    'Time spent parsing one publisher response', ['publisher', 'source'], buckets=LATENCY_BUCKETS,
+)
+SCRAPED_PRODUCTS = _metric(
+    'Counter', 'bookmonitor_scraped_products',
+    'Products seen by the scrapers, kept as books or filtered out', ['publisher', 'source', 'outcome'],
+)
+INGEST_ROWS = _metric(
+    'Counter', 'bookmonitor_ingest_rows',
+    'Scraped records passed to save_books: inserted, updated, unchanged or skipped', ['publisher', 'result'],
+)
+INGEST_SECONDS = _metric(
+    'Histogram', 'bookmonitor_ingest_duration_seconds', 'Duration of save_books', ['publisher'], buckets=LATENCY_BUCKETS,
+)
+INGEST_DB_SECONDS = _metric(
+    'Histogram', 'bookmonitor_ingest_db_duration_seconds',
+    'Time save_books spent in database queries', ['publisher'], buckets=LATENCY_BUCKETS,
+)
+TASK_SECONDS = _metric(
+    'Histogram', 'bookmonitor_task_duration_seconds', 'Celery task duration by outcome', ['task', 'outcome'],
+    buckets=TASK_BUCKETS,
+)
+VIEW_SECONDS = _metric(
+    'Histogram', 'bookmonitor_view_duration_seconds',
+    'Request latency by view', ['view', 'method', 'status'], buckets=LATENCY_BUCKETS,
+)
+VIEW_QUERIES = _metric(
+    'Histogram', 'bookmonitor_view_queries', 'Database queries per request by view', ['view'], buckets=QUERY_BUCKETS,
+)
+
+
+class QueryTimer:
+    """Execute wrapper counting the queries sent on a connection and the time spent waiting for them"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def record_products(publisher, source, seen, kept):
+    SCRAPED_PRODUCTS.labels(publisher.slug, source, 'kept').inc(kept)
+    SCRAPED_PRODUCTS.labels(publisher.slug, source, 'filtered').inc(seen - kept)
+
+
+def exposition():
+    """Returns (body, content type) of the metrics in the Prometheus text format"""
+    registry = prometheus_client.REGISTRY
+    # Celery workers and web processes only share metrics through prometheus_client's multiprocess mode
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,205 @@
+import cProfile
+import heapq
+import importlib.util
+import logging
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# One profile at a time per process: profilers cannot nest, and it bounds the overhead under load
+_profiling = threading.Lock()
+
+
+def _view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Records the latency and query count of every request under the name of the view that served it"""
+
+    def __init__(self, get_response):
+        if metrics.prometheus_client is None:
+            raise MiddlewareNotUsed('prometheus_client is not installed')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = metrics.QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+
+        # Route names keep the label set small; paths would create one series per book
+        view = _view_name(request)
+        metrics.VIEW_SECONDS.labels(view, request.method, response.status_code).observe(time.perf_counter() - started)
+        metrics.VIEW_QUERIES.labels(view).observe(queries.count)
+        return response
+
+
+class QueryRecorder(metrics.QueryTimer):
+    """QueryTimer that also keeps the slowest statements, without their parameters"""
+
+    def __init__(self, keep):
+        super().__init__()
+        self.keep = keep
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, (elapsed, sql))
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (elapsed, sql))
+
+    def statements(self):
+        return sorted(self.slowest, reverse=True)
+
+
+class _CProfiler:
+    suffix = 'prof'
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def save(self, path):
+        self.profiler.dump_stats(path)
+
+
+class _Pyinstrument:
+    suffix = 'html'
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self.profiler = Profiler()
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def save(self, path):
+        path.write_text(self.profiler.output_html())
+
+
+def get_profiler_class():
+    """Returns the profiler configured in BOOK_PROFILER, falling back to cProfile"""
+    configured = getattr(settings, 'BOOK_PROFILER', 'cprofile')
+    if configured == 'pyinstrument':
+        if importlib.util.find_spec('pyinstrument') is not None:
+            return _Pyinstrument
+        logger.warning("Profiler 'pyinstrument' is not installed, using cProfile")
+    elif configured != 'cprofile':
+        logger.warning(f"Unknown profiler '{configured}', using cProfile")
+    return _CProfiler
+
+
+class ProfilingMiddleware:
+    """Reports SQL time per request in Server-Timing and the log, and profiles sampled requests and slow routes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'BOOK_PROFILE_SAMPLE_RATE', 0)
+        self.slow_seconds = getattr(settings, 'BOOK_PROFILE_SLOW_MS', 1000) / 1000
+        self.slowest = getattr(settings, 'BOOK_PROFILE_SLOWEST_QUERIES', 3)
+        self.profile_dir = Path(getattr(settings, 'BOOK_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+        self.profiler_class = get_profiler_class()
+        # A request cannot be known to be slow before it runs, so a slow route gets its next request profiled
+        self.profile_next = set()
+
+    def __call__(self, request):
+        profiler = self.start_profiler(request)
+        queries = QueryRecorder(self.slowest)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                _profiling.release()
+        elapsed = time.perf_counter() - started
+
+        view = _view_name(request)
+        timing = self.server_timing(queries, elapsed)
+        response['Server-Timing'] = f"{response['Server-Timing']}, {timing}" if response.has_header('Server-Timing') else timing
+
+        summary = (
+            f"{request.method} {request.path} ({view}) {response.status_code} in {elapsed * 1000:.1f} ms, "
+            f"{queries.count} queries in {queries.seconds * 1000:.1f} ms"
+        )
+        if profiler is not None:
+            path = self.save_profile(profiler, view, elapsed)
+            logger.info(f"Profiled {summary}: {path}")
+        if elapsed >= self.slow_seconds:
+            if profiler is None:
+                self.profile_next.add(view)
+            statements = '; '.join(f"{seconds * 1000:.1f} ms {sql}" for seconds, sql in queries.statements())
+            logger.warning(f"Slow request {summary}. Slowest queries: {statements or 'none'}")
+        else:
+            logger.debug(summary)
+        return response
+
+    def should_profile(self, request):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.profile_next:
+            try:
+                view = resolve(request.path_info).view_name
+            except Resolver404:
+                return False
+            if view in self.profile_next:
+                self.profile_next.discard(view)
+                return True
+        return False
+
+    def start_profiler(self, request):
+        if not self.should_profile(request) or not _profiling.acquire(blocking=False):
+            return None
+        profiler = self.profiler_class()
+        try:
+            profiler.start()
+        except ValueError as e:
+            # Another profiler, such as a debugger's, is already active in this process
+            _profiling.release()
+            logger.warning(f"Could not start profiler: {e}")
+            return None
+        return profiler
+
+    def server_timing(self, queries, elapsed):
+        entries = [f'total;dur={elapsed * 1000:.1f}', f'db;dur={queries.seconds * 1000:.1f};desc="{queries.count} queries"']
+        # Statements reveal the schema, so they are only sent to clients while debugging
+        if settings.DEBUG:
+            for i, (seconds, sql) in enumerate(queries.statements(), 1):
+                description = ' '.join(sql.split())[:100].replace('"', "'")
+                entries.append(f'sql{i};dur={seconds * 1000:.1f};desc="{description}"')
+        return ', '.join(entries)
+
+    def save_profile(self, profiler, view, elapsed):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{timezone.now():%Y%m%dT%H%M%S}-{view.replace(':', '.')}-{elapsed * 1000:.0f}ms-{uuid.uuid4().hex[:6]}"
+        path = self.profile_dir / f'{name}.{profiler.suffix}'
+        profiler.save(path)
+        return path
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:20
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_books(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+
+    for field, queryset in (
+        ('isbn', Book.objects.exclude(isbn='')),
+        ('book_url', Book.objects.all()),
+    ):
+        duplicates = (
+            queryset.values(field)
+            .annotate(total=Count('id'), keep_id=Min('id'))
+            .filter(total__gt=1)
+        )
+        for duplicate in duplicates:
+            Book.objects.filter(**{field: duplicate[field]}).exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_book_page_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_books, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(condition=models.Q(('isbn', ''), _negated=True), fields=('isbn',), name='unique_book_isbn'),
+        ),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(fields=('book_url',), name='unique_book_url'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_unique_isbn_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seen_created_at', models.DateTimeField(blank=True, null=True, verbose_name='Creation date of the newest product seen')),
+                ('last_seen_isbn', models.CharField(blank=True, max_length=20, verbose_name='ISBN of the newest product seen')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Last crawl date')),
+                ('publisher', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_state', to='books.publisher', verbose_name='Publisher')),
+            ],
+            options={
+                'verbose_name': 'Crawl state',
+                'verbose_name_plural': 'Crawl states',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_crawlstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchValidator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True, verbose_name='URL')),
+                ('etag', models.CharField(blank=True, max_length=255, verbose_name='ETag')),
+                ('last_modified', models.CharField(blank=True, max_length=64, verbose_name='Last-Modified')),
+                ('content_hash', models.CharField(blank=True, max_length=64, verbose_name='Content hash')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Last fetch date')),
+            ],
+            options={
+                'verbose_name': 'Fetch validator',
+                'verbose_name_plural': 'Fetch validators',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-18 11:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_fetchvalidator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayloadSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256 of the raw payload')),
+                ('compression', models.CharField(max_length=10, verbose_name='Compression')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Raw size in bytes')),
+                ('source_url', models.URLField(blank=True, max_length=500, verbose_name='Source URL')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fetch date')),
+                ('publisher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='books.publisher', verbose_name='Publisher')),
+            ],
+            options={
+                'verbose_name': 'Payload snapshot',
+                'verbose_name_plural': 'Payload snapshots',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['publisher', '-created_at'], name='books_paylo_publish_e541b1_idx')],
+            },
+        ),
+    ]
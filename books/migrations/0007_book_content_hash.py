@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_payloadsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Fingerprint of the scraped fields'),
+        ),
+    ]
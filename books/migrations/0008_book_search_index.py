@@ -0,0 +1,79 @@
+# Generated by Django 4.2.20 on 2026-10-18 12:40
+
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+# The statements are copied here rather than imported from books.search, so that later changes to the
+# search code cannot change what this migration does
+
+SQLITE_FTS_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS books_book_fts USING fts5(
+        title, author, description,
+        content='books_book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS books_book_fts_ai AFTER INSERT ON books_book BEGIN
+        INSERT INTO books_book_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_book_fts_ad AFTER DELETE ON books_book BEGIN
+        INSERT INTO books_book_fts(books_book_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_book_fts_au AFTER UPDATE OF title, author, description ON books_book BEGIN
+        INSERT INTO books_book_fts(books_book_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+        INSERT INTO books_book_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END""",
+    "INSERT INTO books_book_fts(books_book_fts) VALUES ('rebuild')",
+]
+
+SQLITE_FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS books_book_fts_ai",
+    "DROP TRIGGER IF EXISTS books_book_fts_ad",
+    "DROP TRIGGER IF EXISTS books_book_fts_au",
+    "DROP TABLE IF EXISTS books_book_fts",
+]
+
+PG_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS books_book_search_idx ON books_book USING GIN ((to_tsvector('english', "
+    "coalesce(books_book.title, '') || ' ' || coalesce(books_book.author, '') || ' ' || "
+    "coalesce(books_book.description, ''))))"
+)
+PG_INDEX_DROP_SQL = "DROP INDEX IF EXISTS books_book_search_idx"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            for statement in SQLITE_FTS_SQL:
+                schema_editor.execute(statement)
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 is not available, search falls back to LIKE queries: {e}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(PG_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP_SQL:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(PG_INDEX_DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_book_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+def populate_book_stats(apps, schema_editor):
+    Publisher = apps.get_model('books', 'Publisher')
+    Book = apps.get_model('books', 'Book')
+
+    stats = Book.objects.order_by().values('publisher_id').annotate(
+        count=models.Count('id'), latest=models.Max('publication_date'),
+    )
+    for row in stats:
+        Publisher.objects.filter(pk=row['publisher_id']).update(
+            book_count=row['count'], latest_publication_date=row['latest'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of books'),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='latest_publication_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Latest publication date'),
+        ),
+        migrations.RunPython(populate_book_stats, migrations.RunPython.noop),
+    ]
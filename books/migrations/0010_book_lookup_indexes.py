@@ -0,0 +1,25 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_publisher_book_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['isbn'], name='books_book_isbn_54becd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_at'], name='books_book_created_572b47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('page_count__lt', 200)), fields=['page_count'], name='books_book_short_idx'),
+        ),
+    ]
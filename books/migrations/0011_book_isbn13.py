@@ -0,0 +1,86 @@
+# Generated by Django 4.2.20 on 2026-10-18 14:20
+
+import re
+
+from django.db import migrations, models
+
+# Normalization and backfill are copied from books.isbn as of this migration, so that later changes there
+# cannot change what it does
+
+
+def _isbn13_check_digit(digits):
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def _isbn10_check_digit(digits):
+    total = sum(int(digit) * (10 - i) for i, digit in enumerate(digits[:9]))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+def normalize_isbn(value):
+    if not value:
+        return None
+
+    digits = re.sub(r'[^0-9X]', '', str(value).upper())
+    if len(digits) == 10 and digits[:9].isdigit() and _isbn10_check_digit(digits) == digits[9]:
+        digits = '978' + digits[:9]
+        return int(digits + _isbn13_check_digit(digits))
+    if len(digits) == 13 and digits.isdigit() and digits[:3] in ('978', '979') and _isbn13_check_digit(digits) == digits[12]:
+        return int(digits)
+    return None
+
+
+def populate_isbn13(apps, schema_editor):
+    # A book whose ISBN normalizes to one another book already holds stays without isbn13,
+    # so the unique constraint added below always holds
+    Book = apps.get_model('books', 'Book')
+    last_id = 0
+    while True:
+        batch = list(
+            Book.objects.filter(id__gt=last_id, isbn13__isnull=True)
+            .exclude(isbn='')
+            .order_by('id')
+            .only('id', 'isbn')[:1000]
+        )
+        if not batch:
+            return
+        last_id = batch[-1].id
+
+        normalized = {book.id: normalize_isbn(book.isbn) for book in batch}
+        owners = set(
+            Book.objects.filter(isbn13__in={value for value in normalized.values() if value})
+            .values_list('isbn13', flat=True)
+        )
+
+        changed = []
+        for book in batch:
+            isbn13 = normalized[book.id]
+            if isbn13 is None or isbn13 in owners:
+                continue
+            owners.add(isbn13)
+            book.isbn13 = isbn13
+            changed.append(book)
+
+        Book.objects.bulk_update(changed, ['isbn13'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_book_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='isbn13',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Normalized ISBN-13'),
+        ),
+        migrations.RunPython(populate_isbn13, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(condition=models.Q(('isbn13__isnull', False)), fields=('isbn13',), name='unique_book_isbn13'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:00
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+# Slug, display name and every name the publisher was created under. The O'Reilly scraper used to
+# create "O'Reilly Media, Inc." next to the "O'Reilly Media" row the rest of the app looked up.
+SCRAPED_PUBLISHERS = [
+    ('oreilly', "O'Reilly Media", ["O'Reilly Media", "O'Reilly Media, Inc."]),
+    ('manning', "Manning Publications", ["Manning Publications"]),
+    ('packt', "Packt Publishing", ["Packt Publishing"]),
+]
+
+
+def merge_publishers(apps, schema_editor):
+    Publisher = apps.get_model('books', 'Publisher')
+    Book = apps.get_model('books', 'Book')
+    CrawlState = apps.get_model('books', 'CrawlState')
+    PayloadSnapshot = apps.get_model('books', 'PayloadSnapshot')
+
+    for slug, name, aliases in SCRAPED_PUBLISHERS:
+        publishers = sorted(Publisher.objects.filter(name__in=aliases), key=lambda p: (p.name != name, p.id))
+        if not publishers:
+            continue
+
+        keep, *duplicates = publishers
+        for duplicate in duplicates:
+            Book.objects.filter(publisher=duplicate).update(publisher=keep)
+            PayloadSnapshot.objects.filter(publisher=duplicate).update(publisher=keep)
+            if not CrawlState.objects.filter(publisher=keep).exists():
+                CrawlState.objects.filter(publisher=duplicate).update(publisher=keep)
+            for field in ('description', 'website', 'logo_url'):
+                if not getattr(keep, field):
+                    setattr(keep, field, getattr(duplicate, field))
+            duplicate.delete()
+
+        keep.name = name
+        keep.slug = slug
+        keep.save()
+
+    taken = set(Publisher.objects.exclude(slug='').values_list('slug', flat=True))
+    for publisher in Publisher.objects.filter(slug='').order_by('id'):
+        base = slugify(publisher.name)[:40] or 'publisher'
+        slug, suffix = base, 2
+        while slug in taken:
+            slug, suffix = f'{base}-{suffix}', suffix + 1
+        taken.add(slug)
+        publisher.slug = slug
+        publisher.save(update_fields=['slug'])
+
+    for publisher in Publisher.objects.all():
+        books = Book.objects.filter(publisher=publisher)
+        publisher.book_count = books.count()
+        publisher.latest_publication_date = books.aggregate(latest=models.Max('publication_date'))['latest']
+        publisher.save(update_fields=['book_count', 'latest_publication_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_book_isbn13'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='slug',
+            field=models.SlugField(blank=True, default='', verbose_name='Slug'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_publishers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='publisher',
+            name='slug',
+            field=models.SlugField(blank=True, unique=True, verbose_name='Slug'),
+        ),
+    ]
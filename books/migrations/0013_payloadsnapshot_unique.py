@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+def merge_duplicate_snapshots(apps, schema_editor):
+    """Keeps the newest index row of each publisher and payload"""
+    PayloadSnapshot = apps.get_model('books', 'PayloadSnapshot')
+    duplicated = (
+        PayloadSnapshot.objects.order_by().values('publisher_id', 'content_hash')
+        .annotate(rows=models.Count('id')).filter(rows__gt=1)
+    )
+    for row in duplicated.iterator():
+        ids = list(
+            PayloadSnapshot.objects.filter(publisher_id=row['publisher_id'], content_hash=row['content_hash'])
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        PayloadSnapshot.objects.filter(id__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_publisher_slug'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_snapshots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payloadsnapshot',
+            constraint=models.UniqueConstraint(fields=('publisher', 'content_hash'), name='unique_snapshot_per_publisher'),
+        ),
+    ]
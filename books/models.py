@@ -1,13 +1,66 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
+from django.utils.text import slugify
+from .cache import invalidate_publishers
+from .isbn import normalize_isbn
+from .utils import MIN_PAGE_COUNT, publication_window
+
+
+class PublisherQuerySet(models.QuerySet):
+    def books_added(self, publisher_id, count, latest_date):
+        """Counts new books towards a publisher; call inside the transaction that inserted them"""
+        return self.filter(pk=publisher_id).update(
+            book_count=models.F('book_count') + count,
+            latest_publication_date=Greatest(
+                Coalesce('latest_publication_date', models.Value(latest_date)), models.Value(latest_date)
+            ),
+        )
+
+    def books_removed(self, counts):
+        """Takes deleted books off the publishers in counts ({publisher_id: removed}) and re-reads their latest date"""
+        latest = Book.objects.filter(publisher=models.OuterRef('pk')).order_by('-publication_date')
+        for publisher_id, count in counts.items():
+            self.filter(pk=publisher_id).update(
+                book_count=Greatest(models.F('book_count') - count, models.Value(0)),
+                latest_publication_date=models.Subquery(latest.values('publication_date')[:1]),
+            )
+
+    def reconcile(self):
+        """Recomputes the stored book statistics and returns the publishers that had drifted"""
+        stats = {
+            row['publisher_id']: row
+            for row in Book.objects.order_by().values('publisher_id').annotate(
+                count=models.Count('id'), latest=models.Max('publication_date'),
+            )
+        }
+
+        drifted = []
+        for publisher in self.order_by('id'):
+            row = stats.get(publisher.id, {'count': 0, 'latest': None})
+            if (publisher.book_count, publisher.latest_publication_date) != (row['count'], row['latest']):
+                publisher.book_count = row['count']
+                publisher.latest_publication_date = row['latest']
+                drifted.append(publisher)
+
+        Publisher.objects.bulk_update(drifted, ['book_count', 'latest_publication_date'])
+        invalidate_publishers(publisher.id for publisher in drifted)
+        return drifted
 
 
 class Publisher(models.Model):
     """Model for storing publisher information"""
     name = models.CharField(max_length=100, verbose_name="Publisher name")
+    # Stable key for the scraper registry and lookups; filled from the name when left empty
+    slug = models.SlugField(max_length=50, unique=True, blank=True, verbose_name="Slug")
     description = models.TextField(blank=True, verbose_name="Publisher description")
     website = models.URLField(blank=True, verbose_name="Website")
     logo_url = models.URLField(blank=True, verbose_name="Logo URL")
+    # Maintained by ingestion and deletes so list pages do not aggregate the book table
+    book_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Number of books")
+    latest_publication_date = models.DateField(null=True, blank=True, editable=False, verbose_name="Latest publication date")
+
+    objects = PublisherQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Publisher"
@@ -17,6 +70,61 @@ class Publisher(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = self.unique_slug()
+        super().save(*args, **kwargs)
+        invalidate_publishers([self.pk])
+
+    def unique_slug(self):
+        """Slug of the name, suffixed with -2, -3... while another publisher already uses it"""
+        base = slugify(self.name)[:40] or 'publisher'
+        taken = set(Publisher.objects.filter(slug__startswith=base).exclude(pk=self.pk).values_list('slug', flat=True))
+        slug, suffix = base, 2
+        while slug in taken:
+            slug, suffix = f'{base}-{suffix}', suffix + 1
+        return slug
+
+    def delete(self, *args, **kwargs):
+        invalidate_publishers([self.pk])
+        return super().delete(*args, **kwargs)
+
+
+class BookQuerySet(models.QuerySet):
+    def with_publisher(self, *fields):
+        """Joins the publisher and loads only the given book columns plus the publisher name"""
+        return self.select_related('publisher').only(*fields, 'publisher__name')
+
+    def outdated(self, today=None, min_pages=MIN_PAGE_COUNT):
+        """Books published outside the publication window or known to be shorter than min_pages"""
+        start, end = publication_window(today)
+        # Manning and Packt do not report page counts, so their books are stored with 0 and must not count as short
+        return self.filter(
+            models.Q(publication_date__lt=start) |
+            models.Q(publication_date__gt=end) |
+            models.Q(page_count__gt=0, page_count__lt=min_pages)
+        )
+
+    def delete(self):
+        with transaction.atomic():
+            removed = dict(self.order_by().values_list('publisher_id').annotate(models.Count('id')))
+            result = super().delete()
+            Publisher.objects.books_removed(removed)
+            invalidate_publishers(removed)
+        return result
+
+    def delete_in_batches(self, batch_size=1000):
+        """Deletes the matching books in bounded transactions and returns how many were removed"""
+        deleted = 0
+        while True:
+            batch = list(self.order_by().values_list('id', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+
+            with transaction.atomic():
+                count, _ = Book.objects.filter(id__in=batch).delete()
+            deleted += count
+
 
 class Book(models.Model):
     """Model for storing book information"""
@@ -28,8 +136,13 @@ class Book(models.Model):
     book_url = models.URLField(verbose_name="Book URL on publisher website")
     publication_date = models.DateField(verbose_name="Publication date")
     isbn = models.CharField(max_length=20, blank=True, verbose_name="ISBN")
+    # ISBN-13 digits of isbn, so the same book is matched whichever notation a source uses
+    isbn13 = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name="Normalized ISBN-13")
     page_count = models.PositiveIntegerField(default=0, blank=True, verbose_name="Page count")
     created_at = models.DateTimeField(default=timezone.now, verbose_name="Date added to system")
+    content_hash = models.CharField(max_length=64, blank=True, default='', verbose_name="Fingerprint of the scraped fields")
+
+    objects = BookQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Book"
@@ -38,7 +151,128 @@ class Book(models.Model):
         indexes = [
             models.Index(fields=['-publication_date']),
             models.Index(fields=['publisher', '-publication_date']),
+            # Ingestion matches scraped records by ISBN; unique_book_isbn is partial and SQLite cannot use it for IN lookups
+            models.Index(fields=['isbn']),
+            # Incremental exports filter on created_at
+            models.Index(fields=['created_at']),
+            # Only short books, so the page-count branch of outdated() is an index search over a small index
+            models.Index(
+                fields=['page_count'],
+                condition=models.Q(page_count__lt=MIN_PAGE_COUNT),
+                name='books_book_short_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['isbn'], condition=~models.Q(isbn=''), name='unique_book_isbn'),
+            models.UniqueConstraint(fields=['book_url'], name='unique_book_url'),
+            models.UniqueConstraint(fields=['isbn13'], condition=models.Q(isbn13__isnull=False), name='unique_book_isbn13'),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.author}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        book = super().from_db(db, field_names, values)
+        # Remembered so that moving a book to another publisher also updates the publisher it left
+        book._loaded_publisher_id = book.__dict__.get('publisher_id')
+        return book
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        previous_publisher_id = getattr(self, '_loaded_publisher_id', None) or self.publisher_id
+        update_fields = kwargs.get('update_fields')
+        moved = previous_publisher_id != self.publisher_id and (update_fields is None or 'publisher' in update_fields)
+        if update_fields is None or 'isbn' in update_fields:
+            self.isbn13 = normalize_isbn(self.isbn)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'isbn13'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            invalidate_publishers([previous_publisher_id, self.publisher_id])
+            if adding:
+                Publisher.objects.books_added(self.publisher_id, 1, self.publication_date)
+            elif moved:
+                Publisher.objects.books_removed({previous_publisher_id: 1})
+                Publisher.objects.books_added(self.publisher_id, 1, self.publication_date)
+            elif 'publication_date' in (kwargs.get('update_fields') or ['publication_date']):
+                # An edited date can only move the latest date forward here; reconcile_publisher_stats repairs the rest
+                Publisher.objects.books_added(self.publisher_id, 0, self.publication_date)
+        self._loaded_publisher_id = self.publisher_id
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Publisher.objects.books_removed({self.publisher_id: 1})
+            invalidate_publishers([self.publisher_id])
+        return result
+
+
+class CrawlState(models.Model):
+    """Model for storing the incremental crawl position of a publisher"""
+    publisher = models.OneToOneField(Publisher, on_delete=models.CASCADE, related_name="crawl_state", verbose_name="Publisher")
+    last_seen_created_at = models.DateTimeField(null=True, blank=True, verbose_name="Creation date of the newest product seen")
+    last_seen_isbn = models.CharField(max_length=20, blank=True, verbose_name="ISBN of the newest product seen")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Last crawl date")
+
+    class Meta:
+        verbose_name = "Crawl state"
+        verbose_name_plural = "Crawl states"
+
+    def __str__(self):
+        return f"{self.publisher} - {self.last_seen_created_at}"
+
+    def is_known(self, created_at, isbn):
+        if isbn and isbn == self.last_seen_isbn:
+            return True
+        return bool(created_at and self.last_seen_created_at and created_at <= self.last_seen_created_at)
+
+
+class FetchValidator(models.Model):
+    """Model for storing HTTP cache validators of fetched pages"""
+    url = models.URLField(max_length=500, unique=True, verbose_name="URL")
+    etag = models.CharField(max_length=255, blank=True, verbose_name="ETag")
+    last_modified = models.CharField(max_length=64, blank=True, verbose_name="Last-Modified")
+    content_hash = models.CharField(max_length=64, blank=True, verbose_name="Content hash")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Last fetch date")
+
+    class Meta:
+        verbose_name = "Fetch validator"
+        verbose_name_plural = "Fetch validators"
+
+    def __str__(self):
+        return self.url
+
+    def request_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PayloadSnapshot(models.Model):
+    """Model for indexing raw publisher payloads kept in the snapshot store"""
+    # One row per publisher and distinct payload, dated by its latest fetch. Snapshots are kept until
+    # deleted; removing rows does not remove their blobs, which other publishers' rows may share.
+    publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE, related_name="snapshots", verbose_name="Publisher")
+    content_hash = models.CharField(max_length=64, db_index=True, verbose_name="SHA-256 of the raw payload")
+    compression = models.CharField(max_length=10, verbose_name="Compression")
+    size = models.PositiveIntegerField(default=0, verbose_name="Raw size in bytes")
+    source_url = models.URLField(max_length=500, blank=True, verbose_name="Source URL")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Fetch date")
+
+    class Meta:
+        verbose_name = "Payload snapshot"
+        verbose_name_plural = "Payload snapshots"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['publisher', '-created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['publisher', 'content_hash'], name='unique_snapshot_per_publisher'),
+        ]
+
+    def __str__(self):
+        return f"{self.publisher} - {self.content_hash[:12]} - {self.created_at}"
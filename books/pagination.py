@@ -0,0 +1,168 @@
+import base64
+import datetime
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Matches the (publisher, -publication_date) and -publication_date indexes; id breaks ties
+ORDERING = ('-publication_date', 'id')
+REVERSE_ORDERING = ('publication_date', '-id')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(position, reverse=False):
+    """Encodes a (publication_date, id) position; reverse cursors page backwards from it"""
+    token = 'p' if reverse else 'n'
+    if position is not None:
+        token += f"|{position[0].isoformat()}|{position[1]}"
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, *position = token.split('|')
+        if direction not in ('n', 'p') or len(position) not in (0, 2):
+            raise ValueError(token)
+        if position:
+            position = (datetime.date.fromisoformat(position[0]), int(position[1]))
+        else:
+            position = None
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    return direction == 'p', position
+
+
+def _position(book):
+    if isinstance(book, dict):
+        return book['publication_date'], book['id']
+    return book.publication_date, book.id
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Pages books by (-publication_date, id) with a WHERE on the last seen row instead of OFFSET and COUNT"""
+    first_cursor = encode_cursor(None)
+    last_cursor = encode_cursor(None, reverse=True)
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        reverse, position = decode_cursor(cursor) if cursor else (False, None)
+
+        if reverse:
+            queryset = self.queryset.order_by(*REVERSE_ORDERING)
+            if position is not None:
+                date, pk = position
+                # The plain range on publication_date comes first so the index can seek to the position
+                queryset = queryset.filter(publication_date__gte=date).filter(Q(publication_date__gt=date) | Q(id__lt=pk))
+        else:
+            queryset = self.queryset.order_by(*ORDERING)
+            if position is not None:
+                date, pk = position
+                queryset = queryset.filter(publication_date__lte=date).filter(Q(publication_date__lt=date) | Q(id__gt=pk))
+
+        # One extra row tells whether there is another page in this direction
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            next_cursor = encode_cursor(_position(rows[-1])) if rows and position is not None else None
+            previous_cursor = encode_cursor(_position(rows[0]), reverse=True) if has_more else None
+        else:
+            next_cursor = encode_cursor(_position(rows[-1])) if has_more else None
+            previous_cursor = encode_cursor(_position(rows[0]), reverse=True) if rows and position is not None else None
+
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin replacing Django's OFFSET paginator with KeysetPaginator (?cursor=)"""
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class BookCursorPagination(BasePagination):
+    """DRF pagination for book endpoints on top of KeysetPaginator"""
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = KeysetPaginator(queryset, self.get_page_size(request)).page(
+                request.query_params.get(self.cursor_query_param)
+            )
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        return self.page.object_list
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,64 @@
+import importlib.util
+import logging
+from bs4 import BeautifulSoup, SoupStrainer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('selectolax', 'lxml', 'html.parser')
+
+
+def _installed(backend):
+    if backend == 'html.parser':
+        return True
+    return importlib.util.find_spec(backend) is not None
+
+
+def get_backend():
+    """Returns the configured HTML parser backend, or the fastest installed one"""
+    configured = getattr(settings, 'BOOK_HTML_PARSER', None)
+    if configured:
+        if configured in BACKENDS and _installed(configured):
+            return configured
+        logger.warning(f"HTML parser backend '{configured}' is not available")
+
+    for backend in BACKENDS:
+        if _installed(backend):
+            return backend
+
+
+class LexborElement:
+    """Wraps a selectolax node with the subset of the BeautifulSoup Tag API the scrapers use"""
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def text(self):
+        return self._node.text()
+
+    def get(self, name, default=None):
+        value = self._node.attributes.get(name)
+        return default if value is None else value
+
+    def select_one(self, selector):
+        node = self._node.css_first(selector)
+        return LexborElement(node) if node is not None else None
+
+    def select(self, selector):
+        return [LexborElement(node) for node in self._node.css(selector)]
+
+
+def select_containers(html, container_class, backend=None):
+    """Parses only the elements carrying container_class and returns them in document order"""
+    backend = backend or get_backend()
+
+    if backend == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+        tree = LexborHTMLParser(html)
+        return [LexborElement(node) for node in tree.css(f'.{container_class}')]
+
+    # Only the product containers and their children are turned into a tree
+    strainer = SoupStrainer(class_=container_class)
+    soup = BeautifulSoup(html, backend, parse_only=strainer)
+    return soup.select(f'.{container_class}')
@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Reserves one token from the bucket and returns how long the caller must wait for it.
+# Tokens may go negative so that concurrent callers queue up instead of polling.
+TOKEN_BUCKET_SCRIPT = '''
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+'''
+
+# Gives back a reserved token; a bucket that has expired in the meantime is already full
+RELEASE_SCRIPT = '''
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'tokens', 1)
+end
+return 0
+'''
+
+UNAVAILABLE_RETRY_SECONDS = 30
+
+
+class RateLimiter:
+    """Per-host token buckets kept in Redis so every Celery worker shares the same request budget"""
+
+    def __init__(self):
+        self._scripts = None
+        self._unavailable_until = 0
+        self._lock = threading.Lock()
+
+    def limit_for(self, host):
+        limits = getattr(settings, 'BOOK_RATE_LIMITS', {})
+        return limits.get(host, limits.get('default'))
+
+    def _get_scripts(self):
+        """Returns the (reserve, release) scripts"""
+        if self._scripts is None:
+            with self._lock:
+                if self._scripts is None:
+                    client = redis.Redis.from_url(
+                        settings.BOOK_RATE_LIMIT_REDIS_URL,
+                        socket_timeout=1,
+                        socket_connect_timeout=1,
+                    )
+                    self._scripts = (client.register_script(TOKEN_BUCKET_SCRIPT), client.register_script(RELEASE_SCRIPT))
+        return self._scripts
+
+    def _limited_host(self, url):
+        """Returns the host of url if its requests are rate limited right now, else None"""
+        if not getattr(settings, 'BOOK_RATE_LIMIT_ENABLED', False):
+            return None
+
+        host = urlsplit(url).netloc
+        if not self.limit_for(host) or time.monotonic() < self._unavailable_until:
+            return None
+        return host
+
+    def reserve(self, url):
+        """Takes a token for the host of url and returns the number of seconds to wait before sending"""
+        host = self._limited_host(url)
+        if host is None:
+            return 0
+
+        limit = self.limit_for(host)
+        try:
+            reserve_script, _ = self._get_scripts()
+            wait = reserve_script(
+                keys=[f"bookmonitor:ratelimit:{host}"],
+                args=[limit['rate'], limit['burst']],
+            )
+        except redis.RedisError as e:
+            # Fail open: a Redis outage should slow nothing down, it just stops coordinating workers
+            logger.warning(f"Rate limiter unavailable, sending requests unthrottled for {UNAVAILABLE_RETRY_SECONDS}s: {e}")
+            self._unavailable_until = time.monotonic() + UNAVAILABLE_RETRY_SECONDS
+            return 0
+
+        return float(wait)
+
+    def release(self, url):
+        """Gives back the token reserved for a request to url that was not sent"""
+        host = self._limited_host(url)
+        if host is None:
+            return
+
+        try:
+            _, release_script = self._get_scripts()
+            release_script(keys=[f"bookmonitor:ratelimit:{host}"])
+        except redis.RedisError as e:
+            logger.warning(f"Could not release rate limit token for {host}: {e}")
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,34 @@
+import functools
+import logging
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Publisher slug -> scraper class. Scraper modules (and bs4, feedparser, requests with them)
+# are only imported the first time a publisher is actually scraped.
+SCRAPERS = {
+    'oreilly': 'books.scrapers.OreillyBookScraper',
+    'manning': 'books.scrapers.ManningBookScraper',
+    'packt': 'books.scrapers.PacktBookScraper',
+}
+
+
+def scraper_paths():
+    return getattr(settings, 'BOOK_SCRAPERS', SCRAPERS)
+
+
+@functools.lru_cache(maxsize=None)
+def get_scraper(slug):
+    """Returns the shared scraper instance for a publisher slug, or None if the publisher is not scraped"""
+    path = scraper_paths().get(slug)
+    if path is None:
+        return None
+    return import_string(path)()
+
+
+def get_scraper_for_publisher(publisher):
+    scraper = get_scraper(publisher.slug)
+    if scraper is None:
+        logger.warning(f"Scraper for publisher '{publisher.name}' not found")
+    return scraper
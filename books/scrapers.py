@@ -1,75 +1,86 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import io
 import logging
 from abc import ABC, abstractmethod
 from datetime import datetime
 from django.utils import timezone
-from .models import Publisher, Book
+from . import metrics
+from .models import CrawlState, FetchValidator
+from .fetch import AsyncFetcher
+from .ingest import ingest_books
+from .snapshots import save_snapshot
+from .parsing import select_containers
+from .streaming import NoProductData, iter_products
+from .utils import MIN_PAGE_COUNT, publication_window
 import json
 import re
 import time
 import feedparser
 from django.utils import timezone as django_timezone
+from django.utils.dateparse import parse_datetime
+from django.conf import settings
+from asgiref.sync import async_to_sync, sync_to_async
 
 logger = logging.getLogger(__name__)
 
 
+class ScrapedBooks(list):
+    """List of scraped books that also carries the crawl bookkeeping to commit once they are saved"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.watermark = None
+        self.validators = []
+
+
 class BookScraper(ABC):
-    def __init__(self, publisher):
-        self.publisher = publisher
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    """Scraper for one publisher site; instances hold only configuration and are shared, so the publisher is passed in"""
 
     @abstractmethod
-    def get_latest_books(self, limit=10):
+    async def aget_latest_books(self, publisher, limit=10, fetcher=None):
         pass
 
-    def save_books(self, books_data):
-        new_books = []
-        for book_data in books_data:
-            try:
-                existing_book = Book.objects.filter(book_url=book_data['book_url']).first()
-                if not existing_book:
-                    book = Book(
-                        title=book_data['title'],
-                        author=book_data['author'],
-                        publisher=self.publisher,
-                        description=book_data.get('description', ''),
-                        cover_url=book_data.get('cover_url', ''),
-                        book_url=book_data['book_url'],
-                        publication_date=book_data['publication_date'],
-                        isbn=book_data.get('isbn', ''),
-                    )
-                    book.save()
-                    new_books.append(book)
-                    logger.info(f"Saved new book: {book.title}")
-            except Exception as e:
-                logger.error(f"Error saving book {book_data.get('title', 'Unknown')}: {str(e)}")
-
+    def get_latest_books(self, publisher, limit=10):
+        # Unlike asyncio.run, async_to_sync runs the ORM calls of the crawl back on this thread and its
+        # connection, which Celery closes after each task
+        return async_to_sync(self.aget_latest_books)(publisher, limit)
+
+    def resolve_url(self, url):
+        """Moves url to the origin BOOK_SCRAPER_ORIGINS maps its origin to, e.g. a local stand-in server"""
+        for origin, replacement in getattr(settings, 'BOOK_SCRAPER_ORIGINS', {}).items():
+            if url == origin or url.startswith(origin) and url[len(origin)] in '/?':
+                return replacement.rstrip('/') + url[len(origin):]
+        return url
+
+    def save_books(self, publisher, books_data):
+        new_books = ingest_books(publisher, books_data)
+        self.commit_crawl(publisher, books_data)
         return new_books
 
-
-class OreillyBookScraper:
-    def __init__(self):
-        self.publisher_name = "O'Reilly Media, Inc."
-        self.publisher, _ = Publisher.objects.get_or_create(name=self.publisher_name)
-        self.api_url = "https://www.oreilly.com/search/api/search/"
-        self.params = {
-            "q": "*",
-            "type": "book",
-            "publishers": "O'Reilly Media, Inc.",
-            "order_by": "created_at",
-            "rows": 100,
-            "language": "en"
-        }
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36",
-            "Accept": "application/json",
-            "Referer": "https://www.oreilly.com/search/",
-            "Origin": "https://www.oreilly.com"
-        }
+    def commit_crawl(self, publisher, books_data):
+        for validator in getattr(books_data, 'validators', []):
+            FetchValidator.objects.update_or_create(url=validator['url'], defaults=validator)
+
+
+class OreillyBookScraper(BookScraper):
+    # Publisher name as the O'Reilly search API reports it
+    publisher_name = "O'Reilly Media, Inc."
+    api_url = "https://www.oreilly.com/search/api/search/"
+    params = {
+        "q": "*",
+        "type": "book",
+        "publishers": "O'Reilly Media, Inc.",
+        "order_by": "created_at",
+        "rows": 100,
+        "language": "en"
+    }
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36",
+        "Accept": "application/json",
+        "Referer": "https://www.oreilly.com/search/",
+        "Origin": "https://www.oreilly.com"
+    }
+    rss_url = "https://www.oreilly.com/content/feed/"
 
     def extract_isbn_from_url(self, url):
         matches = re.findall(r'/(\d{13})/', url)
@@ -77,167 +88,206 @@ class OreillyBookScraper:
             return matches[0]
         return None
 
-    def get_latest_books(self, limit=10):
-        books = []
-
-        try:
-            response = requests.get(
-                self.api_url,
-                params=self.params,
-                headers=self.headers,
-                timeout=30
-            )
-
-            with open('oreilly_api_response.json', 'w', encoding='utf-8') as f:
-                f.write(response.text)
-
-            if response.status_code != 200:
-                logger.warning(f"API returned status {response.status_code}")
-                return self._try_rss_fallback(limit)
-
-            data = response.json()
+    async def aget_latest_books(self, publisher, limit=10, fetcher=None):
+        fetcher = fetcher or AsyncFetcher()
 
-            if not data or 'data' not in data or 'products' not in data['data']:
-                logger.warning("No book data found in API response")
-                return self._try_rss_fallback(limit)
+        # The RSS feed is requested alongside the API so a fallback costs no extra round trip
+        rss_task = asyncio.ensure_future(fetcher.get_if_changed(self.resolve_url(self.rss_url)))
+        rss_task.add_done_callback(lambda task: task.cancelled() or task.exception())
 
-            current_date = datetime.now(timezone.utc).date()
-            one_month_future = current_date.replace(month=current_date.month+1) if current_date.month < 12 else current_date.replace(year=current_date.year+1, month=1)
-            three_months_past = current_date
+        try:
+            crawl_state = await sync_to_async(self.get_crawl_state)(publisher)
+            books = await self._crawl_api(publisher, fetcher, crawl_state, limit)
+        except Exception as e:
+            logger.error(f"Error getting O'Reilly books via API: {e}")
+            books = None
 
-            for _ in range(3):
-                month = three_months_past.month - 1
-                year = three_months_past.year
-                if month == 0:
-                    month = 12
-                    year -= 1
-                three_months_past = three_months_past.replace(year=year, month=month)
+        if books is None:
+            return await self._try_rss_fallback(publisher, limit, rss_task)
 
-            logger.info(f"Looking for books published between {three_months_past} and {one_month_future}")
+        rss_task.cancel()
+        return books
 
-            processed_count = 0
-            for product in data['data']['products']:
-                processed_count += 1
+    def get_crawl_state(self, publisher):
+        crawl_state, _ = CrawlState.objects.get_or_create(publisher=publisher)
+        return crawl_state
 
-                if product.get('type') != 'book':
-                    continue
+    async def _fetch_api_page(self, fetcher, page):
+        return await fetcher.get(
+            self.resolve_url(self.api_url),
+            params={**self.params, 'page': page},
+            headers=self.headers,
+        )
 
-                publisher_details = product.get('custom_attributes', {}).get('publisher_details', [])
-                publisher_names = [pub.get('name') for pub in publisher_details if pub.get('name')]
+    async def _crawl_api(self, publisher, fetcher, crawl_state, limit):
+        """Walks the newest-first search results page by page until it reaches products seen by an earlier run"""
+        max_pages = getattr(settings, 'BOOK_OREILLY_MAX_PAGES', 50)
+        books = ScrapedBooks()
+        newest = None
+        processed_count = 0
+        reached_known = False
+        truncated = False
 
-                if not publisher_names or self.publisher_name not in publisher_names:
-                    continue
+        three_months_past, one_month_future = publication_window()
 
-                page_count = product.get('custom_attributes', {}).get('page_count', 0)
-                if not page_count or int(page_count) < 200:
-                    logger.debug(f"Skipping book with low page count ({page_count}): {product.get('title')}")
-                    continue
+        logger.info(f"Looking for books published between {three_months_past} and {one_month_future}")
 
-                pub_date_str = product.get('custom_attributes', {}).get('publication_date')
-                pub_date = None
-                if pub_date_str:
-                    try:
-                        pub_date = datetime.strptime(pub_date_str, '%Y-%m-%d').date()
-
-                        if pub_date < three_months_past or pub_date > one_month_future:
-                            logger.debug(f"Skipping book with publication date out of range ({pub_date}): {product.get('title')}")
-                            continue
+        page = 0
+        while True:
+            try:
+                response = await self._fetch_api_page(fetcher, page)
+            except Exception as e:
+                if page == 0:
+                    raise
+                # Keep the pages already parsed; without a watermark the next run crawls past them again
+                logger.warning(f"Stopped O'Reilly crawl at page {page}: {e}")
+                truncated = True
+                break
 
-                        logger.info(f"Found suitable book: {product.get('title')}, pages: {page_count}, date: {pub_date}")
+            if response.status_code != 200:
+                logger.warning(f"API returned status {response.status_code}")
+                if page == 0:
+                    return None
+                truncated = True
+                break
 
-                    except ValueError:
-                        logger.warning(f"Invalid date format: {pub_date_str}")
-                        continue
-                else:
-                    continue
+            try:
+                await sync_to_async(save_snapshot)(publisher, response.content, response.url or self.api_url)
+            except Exception as e:
+                logger.error(f"Error saving O'Reilly API snapshot: {e}")
 
-                isbn = self.extract_isbn_from_url(product.get('url', ''))
+            page_size = 0
+            parse_started = time.perf_counter()
+            try:
+                for product in iter_products(io.BytesIO(response.content)):
+                    page_size += 1
+                    created_at = parse_datetime(product.get('created_at') or '')
+                    if created_at and django_timezone.is_naive(created_at):
+                        created_at = django_timezone.make_aware(created_at, timezone.utc)
+                    isbn = self.extract_isbn_from_url(product.get('url', ''))
+
+                    if crawl_state.is_known(created_at, isbn):
+                        reached_known = True
+                        break
+
+                    processed_count += 1
+                    newest = newest or (created_at, isbn)
+
+                    book_data = self._parse_product(product, isbn, three_months_past, one_month_future)
+                    if book_data:
+                        books.append(book_data)
+
+                    if limit and len(books) >= limit:
+                        truncated = True
+                        break
+            except NoProductData:
+                logger.warning("No book data found in API response")
+                if page == 0:
+                    return None
+                truncated = True
+                break
+            finally:
+                metrics.PARSE_SECONDS.labels(publisher.slug, 'api').observe(time.perf_counter() - parse_started)
+
+            if reached_known or truncated or page_size < self.params['rows']:
+                break
+            if page + 1 >= max_pages:
+                logger.warning(f"Stopped O'Reilly crawl after {max_pages} pages without reaching known products")
+                break
+            page += 1
+
+        if newest and not truncated:
+            books.watermark = newest
+
+        metrics.record_products(publisher, 'api', processed_count, len(books))
+        logger.info(f"Processed {processed_count} books from API, found {len(books)} suitable books")
 
-                book_data = {
-                    'title': product.get('title', ''),
-                    'authors': ', '.join(product.get('authors', [])),
-                    'isbn': isbn,
-                    'url': product.get('url', ''),
-                    'image_url': product.get('cover_image', ''),
-                    'publisher': self.publisher,
-                    'publication_date': datetime.combine(pub_date, datetime.min.time()).replace(tzinfo=timezone.utc) if pub_date else django_timezone.now(),
-                    'description': product.get('description', ''),
-                    'page_count': page_count
-                }
+        return books
 
-                books.append(book_data)
+    def _parse_product(self, product, isbn, three_months_past, one_month_future):
+        if product.get('type') != 'book':
+            return None
 
-                if len(books) >= limit:
-                    break
+        publisher_details = product.get('custom_attributes', {}).get('publisher_details', [])
+        publisher_names = [pub.get('name') for pub in publisher_details if pub.get('name')]
 
-            logger.info(f"Processed {processed_count} books from API, found {len(books)} suitable books")
+        if not publisher_names or self.publisher_name not in publisher_names:
+            return None
 
-        except Exception as e:
-            logger.error(f"Error getting O'Reilly books via API: {e}")
-            return self._try_rss_fallback(limit)
+        page_count = product.get('custom_attributes', {}).get('page_count', 0)
+        if not page_count or int(page_count) < MIN_PAGE_COUNT:
+            logger.debug(f"Skipping book with low page count ({page_count}): {product.get('title')}")
+            return None
 
-        return books[:limit]
+        pub_date_str = product.get('custom_attributes', {}).get('publication_date')
+        if not pub_date_str:
+            return None
 
-    def save_books(self, books_data):
-        new_books = []
+        try:
+            pub_date = datetime.strptime(pub_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            logger.warning(f"Invalid date format: {pub_date_str}")
+            return None
+
+        if pub_date < three_months_past or pub_date > one_month_future:
+            logger.debug(f"Skipping book with publication date out of range ({pub_date}): {product.get('title')}")
+            return None
+
+        logger.info(f"Found suitable book: {product.get('title')}, pages: {page_count}, date: {pub_date}")
+
+        return {
+            'title': product.get('title', ''),
+            'authors': ', '.join(product.get('authors', [])),
+            'isbn': isbn,
+            'url': product.get('url', ''),
+            'image_url': product.get('cover_image', ''),
+            'publication_date': datetime.combine(pub_date, datetime.min.time()).replace(tzinfo=timezone.utc),
+            'description': product.get('description', ''),
+            'page_count': page_count
+        }
 
+    def save_books(self, publisher, books_data):
+        books_with_isbn = []
         for book_data in books_data:
-            isbn = book_data.get('isbn')
-
-            if not isbn:
+            if not book_data.get('isbn'):
                 logger.warning(f"Skipping book without ISBN: {book_data.get('title')}")
                 continue
+            books_with_isbn.append(book_data)
 
-            existing_book = Book.objects.filter(isbn=isbn).first()
-
-            if not existing_book:
-                try:
-                    book = Book(
-                        title=book_data.get('title', ''),
-                        author=book_data.get('authors', ''),
-                        isbn=isbn,
-                        publisher=self.publisher,
-                        book_url=book_data.get('url', ''),
-                        cover_url=book_data.get('image_url', ''),
-                        description=book_data.get('description', ''),
-                        publication_date=book_data.get('publication_date') or django_timezone.now().date(),
-                        page_count=int(book_data.get('page_count', 0))
-                    )
-                    book.save()
-
-                    logger.info(f"Added new book: {book.title}")
-                    new_books.append(book)
-
-                except Exception as e:
-                    logger.error(f"Error saving book {book_data.get('title')}: {e}")
-            else:
-                logger.debug(f"Book already exists: {existing_book.title}")
-
+        metrics.INGEST_ROWS.labels(publisher.slug, 'skipped').inc(len(books_data) - len(books_with_isbn))
+        new_books = ingest_books(publisher, books_with_isbn)
+        self.commit_crawl(publisher, books_data)
         return new_books
 
-    def _try_rss_fallback(self, limit):
+    def commit_crawl(self, publisher, books_data):
+        super().commit_crawl(publisher, books_data)
+
+        watermark = getattr(books_data, 'watermark', None)
+        if watermark:
+            created_at, isbn = watermark
+            CrawlState.objects.update_or_create(
+                publisher=publisher,
+                defaults={'last_seen_created_at': created_at, 'last_seen_isbn': isbn or ''},
+            )
+
+    async def _try_rss_fallback(self, publisher, limit, rss_task):
         logger.info("Trying to get O'Reilly books via RSS")
-        books = []
+        books = ScrapedBooks()
 
         try:
-            current_date = datetime.now(timezone.utc).date()
-            one_month_future = current_date.replace(month=current_date.month+1) if current_date.month < 12 else current_date.replace(year=current_date.year+1, month=1)
-            three_months_past = current_date
-
-            for _ in range(3):
-                month = three_months_past.month - 1
-                year = three_months_past.year
-                if month == 0:
-                    month = 12
-                    year -= 1
-                three_months_past = three_months_past.replace(year=year, month=month)
+            three_months_past, one_month_future = publication_window()
 
             logger.info(f"Looking for books published between {three_months_past} and {one_month_future}")
 
-            rss_url = "https://www.oreilly.com/content/feed/"
-            feed = feedparser.parse(rss_url)
+            response, validator = await rss_task
+            if response is None:
+                return books
+
+            parse_started = time.perf_counter()
+            feed = feedparser.parse(response.content)
+            entries = feed.entries[:limit*2 if limit else None]
 
-            for entry in feed.entries[:limit*2]:
+            for entry in entries:
                 link = entry.get('link', '')
                 isbn = self.extract_isbn_from_url(link)
 
@@ -257,16 +307,21 @@ class OreillyBookScraper:
                     'isbn': isbn,
                     'url': link,
                     'image_url': '',
-                    'publisher': self.publisher,
                     'publication_date': datetime.combine(pub_date, datetime.min.time()).replace(tzinfo=timezone.utc) if pub_date else django_timezone.now(),
                     'description': entry.get('summary', '')
                 }
 
                 books.append(book_data)
 
-                if len(books) >= limit:
+                if limit and len(books) >= limit:
                     break
 
+            metrics.PARSE_SECONDS.labels(publisher.slug, 'rss').observe(time.perf_counter() - parse_started)
+            metrics.record_products(publisher, 'rss', len(entries), len(books))
+
+            if validator:
+                books.validators.append(validator)
+
             logger.info(f"Found {len(books)} O'Reilly books via RSS")
 
         except Exception as e:
@@ -275,29 +330,30 @@ class OreillyBookScraper:
         return books
 
 
-class ManningBookScraper:
-    def __init__(self):
-        self.base_url = "https://www.manning.com/catalog/sort/sort-by-date"
-        self.publisher, _ = Publisher.objects.get_or_create(name="Manning Publications")
+class ManningBookScraper(BookScraper):
+    base_url = "https://www.manning.com/catalog/sort/sort-by-date"
 
     def extract_isbn_from_url(self, url):
         return None
 
-    def get_latest_books(self, limit=10):
-        books = []
+    async def aget_latest_books(self, publisher, limit=10, fetcher=None):
+        fetcher = fetcher or AsyncFetcher()
+        books = ScrapedBooks()
 
         try:
-            response = requests.get(self.base_url, timeout=30)
+            response, validator = await fetcher.get_if_changed(self.resolve_url(self.base_url), timeout=30)
+
+            if response is None:
+                return books
 
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch Manning books. Status code: {response.status_code}")
                 return books
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            parse_started = time.perf_counter()
+            book_elements = select_containers(response.text, 'book-item')[:limit]
 
-            book_elements = soup.select('.book-item')
-
-            for book_element in book_elements[:limit]:
+            for book_element in book_elements:
                 title_element = book_element.select_one('.book-title')
                 if not title_element:
                     continue
@@ -323,13 +379,18 @@ class ManningBookScraper:
                     'isbn': None,
                     'url': url,
                     'image_url': image_url,
-                    'publisher': self.publisher,
                     'publication_date': django_timezone.now(),
                     'description': ''
                 }
 
                 books.append(book_data)
 
+            metrics.PARSE_SECONDS.labels(publisher.slug, 'html').observe(time.perf_counter() - parse_started)
+            metrics.record_products(publisher, 'html', len(book_elements), len(books))
+
+            if validator:
+                books.validators.append(validator)
+
             logger.info(f"Found {len(books)} Manning books")
 
         except Exception as e:
@@ -338,10 +399,8 @@ class ManningBookScraper:
         return books
 
 
-class PacktBookScraper:
-    def __init__(self):
-        self.base_url = "https://www.packtpub.com/all-books/all"
-        self.publisher, _ = Publisher.objects.get_or_create(name="Packt Publishing")
+class PacktBookScraper(BookScraper):
+    base_url = "https://www.packtpub.com/all-books/all"
 
     def extract_isbn_from_url(self, url):
         matches = re.findall(r'/(\d{13})$', url)
@@ -349,21 +408,24 @@ class PacktBookScraper:
             return matches[0]
         return None
 
-    def get_latest_books(self, limit=10):
-        books = []
+    async def aget_latest_books(self, publisher, limit=10, fetcher=None):
+        fetcher = fetcher or AsyncFetcher()
+        books = ScrapedBooks()
 
         try:
-            response = requests.get(self.base_url, timeout=30)
+            response, validator = await fetcher.get_if_changed(self.resolve_url(self.base_url), timeout=30)
+
+            if response is None:
+                return books
 
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch Packt books. Status code: {response.status_code}")
                 return books
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            parse_started = time.perf_counter()
+            book_elements = select_containers(response.text, 'product-item')[:limit]
 
-            book_elements = soup.select('.product-item')
-
-            for book_element in book_elements[:limit]:
+            for book_element in book_elements:
                 title_element = book_element.select_one('.product-item-link')
                 if not title_element:
                     continue
@@ -394,13 +456,18 @@ class PacktBookScraper:
                     'isbn': isbn,
                     'url': url,
                     'image_url': image_url,
-                    'publisher': self.publisher,
                     'publication_date': pub_date,
                     'description': ''
                 }
 
                 books.append(book_data)
 
+            metrics.PARSE_SECONDS.labels(publisher.slug, 'html').observe(time.perf_counter() - parse_started)
+            metrics.record_products(publisher, 'html', len(book_elements), len(books))
+
+            if validator:
+                books.validators.append(validator)
+
             logger.info(f"Found {len(books)} Packt books")
 
         except Exception as e:
@@ -409,16 +476,10 @@ class PacktBookScraper:
         return books
 
 
-def get_scraper_for_publisher(publisher):
-    scrapers = {
-        "O'Reilly Media": OreillyBookScraper,
-        "Manning Publications": ManningBookScraper,
-        "Packt Publishing": PacktBookScraper,
-    }
+async def fetch_latest_books(jobs, limit=10):
+    """Fetches the latest books of several (scraper, publisher) pairs in parallel under one shared deadline"""
+    fetcher = AsyncFetcher()
+    return await asyncio.gather(
+        *(scraper.aget_latest_books(publisher, limit, fetcher=fetcher) for scraper, publisher in jobs)
+    )
 
-    scraper_class = scrapers.get(publisher.name)
-    if scraper_class:
-        return scraper_class()
-    else:
-        logger.warning(f"Scraper for publisher '{publisher.name}' not found")
-        return None
\ No newline at end of file
@@ -0,0 +1,94 @@
+import re
+from django.db import connection
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+# Created by migration 0008, whose index expression PG_VECTOR must match for PostgreSQL to use the index
+FTS_TABLE = 'books_book_fts'
+PG_VECTOR = (
+    "to_tsvector('english', coalesce(books_book.title, '') || ' ' || "
+    "coalesce(books_book.author, '') || ' ' || coalesce(books_book.description, ''))"
+)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+class IContainsSearchBackend:
+    """Substring search for databases without a full-text index"""
+
+    def search(self, queryset, query, ranked=True):
+        condition = Q()
+        for term in search_terms(query):
+            condition &= Q(title__icontains=term) | Q(author__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition)
+
+
+class SqliteSearchBackend:
+    """FTS5 search with prefix matching and bm25 ranking (title weighs most, then author)"""
+
+    def search(self, queryset, query, ranked=True):
+        match = ' '.join(f'"{term}"*' for term in search_terms(query))
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = books_book.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        )
+        if ranked:
+            queryset = queryset.extra(
+                select={'search_rank': f'bm25({FTS_TABLE}, 10.0, 5.0, 1.0)'},
+                order_by=['search_rank'],
+            )
+        return queryset
+
+
+class PostgresSearchBackend:
+    """tsvector search served by the books_book_search_idx GIN index, ranked with ts_rank"""
+
+    def search(self, queryset, query, ranked=True):
+        tsquery = ' & '.join(f'{term}:*' for term in search_terms(query))
+        queryset = queryset.extra(
+            where=[f"{PG_VECTOR} @@ to_tsquery('english', %s)"],
+            params=[tsquery],
+        )
+        if ranked:
+            queryset = queryset.extra(
+                select={'search_rank': f"ts_rank({PG_VECTOR}, to_tsquery('english', %s))"},
+                select_params=[tsquery],
+                order_by=['-search_rank'],
+            )
+        return queryset
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backend = SqliteSearchBackend()
+        else:
+            _backend = IContainsSearchBackend()
+    return _backend
+
+
+def search_books(queryset, query, ranked=True):
+    """Restricts a Book queryset to full-text matches of query, best matches first when ranked"""
+    if not search_terms(query):
+        return queryset.none()
+    return get_search_backend().search(queryset, query, ranked=ranked)
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """DRF filter backend applying search_books to the ?q= parameter"""
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param)
+        if not query:
+            return queryset
+        return search_books(queryset, query, ranked=getattr(view, 'search_ranked', True))
@@ -6,7 +6,7 @@ class PublisherSerializer(serializers.ModelSerializer):
     """Serializer for Publisher model"""
     class Meta:
         model = Publisher
-        fields = ['id', 'name', 'description', 'website', 'logo_url']
+        fields = ['id', 'name', 'slug', 'description', 'website', 'logo_url', 'book_count', 'latest_publication_date']
 
 
 class BookSerializer(serializers.ModelSerializer):
@@ -19,4 +19,23 @@ class BookSerializer(serializers.ModelSerializer):
             'id', 'title', 'author', 'publisher', 'publisher_name',
             'description', 'cover_url', 'book_url', 'publication_date',
             'isbn', 'created_at'
-        ]
\ No newline at end of file
+        ]
+
+
+class BookReadSerializer(serializers.BaseSerializer):
+    """Read-only BookSerializer output built straight from Book.objects.values() rows"""
+    # Columns of the values() projection, in BookSerializer field order
+    columns = {
+        'id': 'id', 'title': 'title', 'author': 'author', 'publisher': 'publisher_id',
+        'publisher_name': 'publisher__name', 'description': 'description', 'cover_url': 'cover_url',
+        'book_url': 'book_url', 'publication_date': 'publication_date', 'isbn': 'isbn',
+        'created_at': 'created_at',
+    }
+    date_field = serializers.DateField()
+    datetime_field = serializers.DateTimeField()
+
+    def to_representation(self, row):
+        data = {name: row[column] for name, column in self.columns.items()}
+        data['publication_date'] = self.date_field.to_representation(data['publication_date'])
+        data['created_at'] = self.datetime_field.to_representation(data['created_at'])
+        return data
@@ -0,0 +1,83 @@
+import logging
+import os
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying response: its Retry-After up to BOOK_HTTP_MAX_RETRY_AFTER, else backoff with jitter"""
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return min(Retry().parse_retry_after(retry_after), getattr(settings, 'BOOK_HTTP_MAX_RETRY_AFTER', 60))
+        except InvalidHeader:
+            pass
+    backoff = getattr(settings, 'BOOK_HTTP_BACKOFF', 0.5) * 2 ** attempt
+    return backoff + random.uniform(0, getattr(settings, 'BOOK_HTTP_BACKOFF_JITTER', 0.5))
+
+
+def _build_session():
+    # Only failed connections are retried here, before anything reaches the publisher. AsyncFetcher retries
+    # RETRY_STATUSES responses itself so that every request it resends takes a rate limit token.
+    retries = getattr(settings, 'BOOK_HTTP_RETRIES', 3)
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        other=0,
+        backoff_factor=getattr(settings, 'BOOK_HTTP_BACKOFF', 0.5),
+        backoff_jitter=getattr(settings, 'BOOK_HTTP_BACKOFF_JITTER', 0.5),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        # urllib3 would otherwise still resend 429 and 503 responses that carry a Retry-After header
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=getattr(settings, 'BOOK_HTTP_POOL_SIZE', 10),
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+
+def get_session(url):
+    """Returns the process-wide keep-alive session for the host of url"""
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _build_session()
+    return session
+
+
+def _reset_after_fork():
+    global _lock
+    _lock = threading.Lock()
+    _sessions.clear()
+
+
+# Pooled sockets must not be shared with forked Celery worker processes
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+from .models import PayloadSnapshot
+from .streaming import DECODE_ERRORS, NoProductData, iter_products
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_dir():
+    return Path(getattr(settings, 'BOOK_SNAPSHOT_DIR', Path(settings.BASE_DIR) / 'snapshots'))
+
+
+def _blob_path(content_hash, compression):
+    return snapshot_dir() / 'objects' / content_hash[:2] / f"{content_hash}.json.{compression}"
+
+
+def _compress(content):
+    if zstandard is not None:
+        return 'zst', zstandard.ZstdCompressor(level=10).compress(content)
+    return 'gz', gzip.compress(content, compresslevel=6)
+
+
+def save_snapshot(publisher, content, source_url=''):
+    """Stores a raw payload compressed under its hash and records it in the publisher index"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    content_hash = hashlib.sha256(content).hexdigest()
+    existing = PayloadSnapshot.objects.filter(content_hash=content_hash).first()
+
+    if existing and _blob_path(content_hash, existing.compression).exists():
+        compression = existing.compression
+    else:
+        compression, compressed = _compress(content)
+        path = _blob_path(content_hash, compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so concurrent workers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+
+    # A payload fetched again only moves its index row forward, so unchanged catalogs add no rows
+    snapshot, _ = PayloadSnapshot.objects.update_or_create(
+        publisher=publisher,
+        content_hash=content_hash,
+        defaults={
+            'compression': compression,
+            'size': len(content),
+            'source_url': source_url,
+            'created_at': timezone.now(),
+        },
+    )
+    logger.debug(f"Saved snapshot {content_hash[:12]} for {publisher.name}")
+    return snapshot
+
+
+def open_snapshot(snapshot):
+    """Opens the decompressed payload of a snapshot as a binary stream"""
+    path = _blob_path(snapshot.content_hash, snapshot.compression)
+    if snapshot.compression == 'zst':
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read snapshot {snapshot.content_hash}")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return gzip.open(path, 'rb')
+
+
+def find_snapshots(publishers, content_hash=None):
+    """Returns the indexed snapshots of the given publishers, newest first"""
+    snapshots = PayloadSnapshot.objects.filter(publisher__in=publishers).order_by('-created_at')
+    if content_hash:
+        snapshots = snapshots.filter(content_hash__startswith=content_hash)
+    return snapshots
+
+
+def iter_snapshot_products(snapshots):
+    """Streams the products of every snapshot in turn, skipping payloads without product data"""
+    for snapshot in snapshots.iterator():
+        try:
+            with open_snapshot(snapshot) as f:
+                yield from iter_products(f)
+        except NoProductData:
+            logger.warning(f"No book data found in snapshot {snapshot.content_hash}")
+        except (OSError, RuntimeError) + DECODE_ERRORS as e:
+            logger.error(f"Error reading snapshot {snapshot.content_hash}: {e}")
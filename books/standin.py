@@ -0,0 +1,268 @@
+import copy
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.module_loading import import_string
+from .isbn import _isbn13_check_digit
+from .registry import scraper_paths
+
+logger = logging.getLogger(__name__)
+
+# Bodies are stored decoded, so encoding and hop-by-hop headers are not replayed
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+# Conditional headers are not forwarded while recording so that full bodies are captured
+FORWARDED_HEADERS = ('User-Agent', 'Accept', 'Accept-Language', 'Referer', 'Origin')
+ISBN13 = re.compile(r'\d{13}')
+# Query parameters that select a slice of a paginated catalog rather than a different catalog
+PAGINATION_PARAMS = ('page', 'rows')
+# ISBNs of the products added by scaling a catalog are numbered from here
+SCALED_ISBN_START = 979900000000
+
+
+def scraper_origins():
+    """Origins of the URLs the registered scrapers fetch from"""
+    origins = set()
+    for path in scraper_paths().values():
+        scraper_class = import_string(path)
+        for name in ('api_url', 'rss_url', 'base_url'):
+            url = getattr(scraper_class, name, None)
+            if url:
+                parts = urlsplit(url)
+                origins.add(f'{parts.scheme}://{parts.netloc}')
+    return sorted(origins)
+
+
+def origin_overrides(address, origins):
+    """BOOK_SCRAPER_ORIGINS that sends each origin to a stand-in listening on address"""
+    return {origin: f'http://{address}/{urlsplit(origin).netloc}' for origin in origins}
+
+
+def canonical_query(query, exclude=()):
+    return urlencode(sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in exclude))
+
+
+class RecordingStore:
+    """Responses captured from publisher sites, kept as a metadata file and a body file per request"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, host, path, query):
+        key = hashlib.sha1(f'{path}?{canonical_query(query)}'.encode()).hexdigest()[:16]
+        return self.directory / host / key
+
+    def save(self, host, path, query, response):
+        base = self._path(host, path, query)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        base.with_suffix('.body').write_bytes(response.content)
+        # The metadata is written last, so a recording is only picked up once its body is complete
+        base.with_suffix('.json').write_text(json.dumps({
+            'host': host,
+            'path': path,
+            'query': canonical_query(query),
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            'recorded_at': timezone.now().isoformat(),
+        }, indent=1))
+
+    def load(self):
+        recordings = []
+        for meta_path in sorted(self.directory.glob('*/*.json')):
+            recording = json.loads(meta_path.read_text())
+            recording['body'] = meta_path.with_suffix('.body').read_bytes()
+            recordings.append(recording)
+        return recordings
+
+
+def _products(recording):
+    """The data.products list of a recorded search page, or None if the body is not one"""
+    try:
+        products = json.loads(recording['body'])['data']['products']
+    except (ValueError, KeyError, TypeError):
+        return None
+    return products if isinstance(products, list) else None
+
+
+def _shift_date(value, shift):
+    day = parse_date(value or '')
+    return (day + shift).isoformat() if day else value
+
+
+def _format_datetime(value):
+    return value.isoformat().replace('+00:00', 'Z')
+
+
+class Catalog:
+    """Search results recorded page by page, served again as one catalog of scale times the products"""
+
+    def __init__(self, pages, scale=1, shift_dates=True):
+        self.envelope = json.loads(pages[0]['body'])
+        self.page_size = len(self.envelope['data']['products']) or 1
+        self.headers = {name: value for name, value in pages[0]['headers'].items() if name in ('Content-Type',)}
+
+        # Dates move forward by the age of the recording so today's publication window keeps the same products
+        recorded_on = min(parse_datetime(page['recorded_at']) for page in pages).date()
+        shift = timezone.now().date() - recorded_on if shift_dates else timedelta(0)
+        products = [product for page in pages for product in _products(page)]
+        self.products = list(self._scaled(products, scale, shift))
+
+    def _scaled(self, products, scale, shift):
+        created = [parse_datetime(product.get('created_at') or '') for product in products]
+        known = [created_at for created_at in created if created_at]
+        # Every copy of the catalog is older than the previous one, so results stay newest first
+        span = max(known) - min(known) + timedelta(minutes=1) if known else timedelta(days=1)
+
+        number = SCALED_ISBN_START
+        for copy_index in range(scale):
+            for product, created_at in zip(products, created):
+                product = copy.deepcopy(product)
+                if copy_index:
+                    isbn = ISBN13.search(product.get('url', ''))
+                    if isbn:
+                        digits = str(number)
+                        number += 1
+                        product = json.loads(json.dumps(product).replace(isbn.group(), digits + _isbn13_check_digit(digits)))
+                    product['title'] = f"{product.get('title', '')} ({copy_index + 1})"
+                if created_at:
+                    product['created_at'] = _format_datetime(created_at + shift - copy_index * span)
+                attributes = product.get('custom_attributes')
+                if isinstance(attributes, dict) and 'publication_date' in attributes:
+                    attributes['publication_date'] = _shift_date(attributes['publication_date'], shift)
+                yield product
+
+    def page(self, query):
+        params = dict(parse_qsl(query))
+        try:
+            page = int(params.get('page', 0))
+            rows = int(params.get('rows', self.page_size))
+        except ValueError:
+            page, rows = 0, self.page_size
+
+        body = copy.copy(self.envelope)
+        body['data'] = {**self.envelope['data'], 'products': self.products[page * rows:(page + 1) * rows]}
+        if 'total' in body['data']:
+            body['data']['total'] = len(self.products)
+        return 200, self.headers, json.dumps(body).encode('utf-8')
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Publisher stand-in serving /<host>/<path> from recordings, or recording them from the real host"""
+    daemon_threads = True
+
+    def __init__(self, address, store, record=False, latency=0, jitter=0, error_rate=0, throttle_rate=0,
+                 retry_after=1, scale=1, shift_dates=True, seed=None):
+        super().__init__(address, StandinHandler)
+        self.store = store
+        self.record = record
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.session = requests.Session()
+        self.recordings = {}
+        self.catalogs = {}
+        if not record:
+            self.load(scale, shift_dates)
+
+    def load(self, scale, shift_dates):
+        pages = {}
+        for recording in self.store.load():
+            self.recordings[recording['host'], recording['path'], recording['query']] = recording
+            params = dict(parse_qsl(recording['query']))
+            if recording['status'] == 200 and 'page' in params and _products(recording) is not None:
+                key = (recording['host'], recording['path'], canonical_query(recording['query'], exclude=PAGINATION_PARAMS))
+                pages.setdefault(key, []).append((int(params['page']), recording))
+
+        for key, numbered in pages.items():
+            self.catalogs[key] = Catalog([recording for _, recording in sorted(numbered, key=lambda item: item[0])],
+                                         scale, shift_dates)
+
+    @property
+    def hosts(self):
+        return sorted({host for host, _, _ in self.recordings})
+
+    def delay(self):
+        return max(0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def fault(self):
+        """An injected error response, or None"""
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429, {'Retry-After': str(self.retry_after)}, b'Too Many Requests'
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, {}, b'Service Unavailable'
+        return None
+
+    def replay(self, host, path, query, request_headers):
+        catalog = self.catalogs.get((host, path, canonical_query(query, exclude=PAGINATION_PARAMS)))
+        if catalog is not None:
+            return catalog.page(query)
+
+        recording = self.recordings.get((host, path, canonical_query(query)))
+        if recording is None:
+            return 404, {'Content-Type': 'text/plain'}, f'No recording for {host}{path}?{query}'.encode('utf-8')
+
+        etag = recording['headers'].get('ETag')
+        if etag and request_headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return recording['status'], recording['headers'], recording['body']
+
+    def forward(self, host, path, query, request_headers):
+        url = f'https://{host}{path}' + (f'?{query}' if query else '')
+        headers = {name: request_headers[name] for name in FORWARDED_HEADERS if name in request_headers}
+        try:
+            response = self.session.get(url, headers=headers, timeout=30)
+        except requests.RequestException as e:
+            logger.error(f"Error recording {url}: {e}")
+            return 502, {'Content-Type': 'text/plain'}, str(e).encode('utf-8')
+
+        # Only successful responses are kept; a transient upstream error should not be replayed forever
+        if response.status_code == 200:
+            self.store.save(host, path, query, response)
+            logger.info(f"Recorded {url} ({len(response.content)} bytes)")
+        else:
+            logger.warning(f"Not recording {url}: status {response.status_code}")
+        headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        return response.status_code, headers, response.content
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the pooled sessions of the scrapers expect
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        host, _, rest = self.path.lstrip('/').partition('/')
+        path, _, query = f'/{rest}'.partition('?')
+
+        if server.record:
+            self.respond(*server.forward(host, path, query, self.headers))
+            return
+
+        time.sleep(server.delay())
+        response = server.fault() or server.replay(host, path, query, self.headers)
+        self.respond(*response)
+
+    def respond(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
@@ -0,0 +1,31 @@
+import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+DECODE_ERRORS = (ValueError, ijson.JSONError) if ijson is not None else (ValueError,)
+
+
+class NoProductData(ValueError):
+    """Raised when a search payload has no data.products array"""
+
+
+def iter_products(stream):
+    """Yields the items of data.products one at a time from a binary JSON stream"""
+    # Without ijson the whole document has to be materialized first
+    if ijson is None:
+        data = json.load(stream)
+        if not data or 'data' not in data or 'products' not in data['data']:
+            raise NoProductData("No book data found in payload")
+        yield from data['data']['products']
+        return
+
+    events = ijson.parse(stream, use_float=True)
+    for prefix, event, _ in events:
+        if prefix == 'data.products' and event == 'start_array':
+            yield from ijson.items(events, 'data.products.item')
+            return
+
+    raise NoProductData("No book data found in payload")
@@ -1,40 +1,115 @@
 import logging
-from celery import shared_task
-from .models import Publisher
-from .scrapers import get_scraper_for_publisher
+import time
+from celery import chord, shared_task
+from celery.signals import task_postrun, task_prerun
+from . import metrics
+from .models import Book, Publisher
+from .registry import get_scraper_for_publisher, scraper_paths
 
 logger = logging.getLogger(__name__)
 
+_task_started = {}
+
+
+@task_prerun.connect
+def _start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.monotonic()
+
+
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, retval=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    # Publisher updates catch their own errors, so their status is the outcome rather than the Celery state
+    if isinstance(retval, dict) and 'status' in retval:
+        outcome = retval['status']
+    else:
+        outcome = (state or 'unknown').lower()
+    metrics.TASK_SECONDS.labels(task.name, outcome).observe(time.monotonic() - started)
+
 
 @shared_task
 def update_books_for_publisher(publisher_id):
+    started = time.monotonic()
+    result = {
+        'publisher_id': publisher_id,
+        'publisher': None,
+        'status': 'ok',
+        'new_books': 0,
+        'duration': 0,
+        'error': None,
+    }
+
     try:
         publisher = Publisher.objects.get(id=publisher_id)
+        result['publisher'] = publisher.name
         scraper = get_scraper_for_publisher(publisher)
 
         if scraper:
-            books_data = scraper.get_latest_books(limit=20)
-            new_books = scraper.save_books(books_data)
+            books_data = scraper.get_latest_books(publisher, limit=None)
+            new_books = scraper.save_books(publisher, books_data)
             logger.info(f"Added {len(new_books)} new books from {publisher.name}")
-            return len(new_books)
+            result['new_books'] = len(new_books)
         else:
             logger.warning(f"Scraper for publisher {publisher.name} not found")
-            return 0
+            result['status'] = 'skipped'
     except Publisher.DoesNotExist:
         logger.error(f"Publisher with ID {publisher_id} not found")
-        return 0
+        result['status'] = 'failed'
+        result['error'] = 'Publisher not found'
     except Exception as e:
         logger.error(f"Error updating books: {str(e)}")
-        return 0
+        result['status'] = 'failed'
+        result['error'] = str(e)
+
+    result['duration'] = round(time.monotonic() - started, 2)
+    return result
+
+
+@shared_task
+def summarize_publisher_updates(results):
+    summary = {
+        'total_new_books': sum(result['new_books'] for result in results),
+        'duration': max((result['duration'] for result in results), default=0),
+        'failed': [result['publisher'] or result['publisher_id'] for result in results if result['status'] == 'failed'],
+        'skipped': [result['publisher'] for result in results if result['status'] == 'skipped'],
+        'publishers': results,
+    }
+
+    for result in results:
+        logger.info(
+            f"{result['publisher'] or result['publisher_id']}: {result['status']}, "
+            f"{result['new_books']} new books in {result['duration']}s"
+        )
+    logger.info(
+        f"Book update finished for {len(results)} publishers: {summary['total_new_books']} new books, "
+        f"{len(summary['failed'])} failed, {len(summary['skipped'])} skipped"
+    )
+    return summary
 
 
 @shared_task
 def update_all_publishers_books():
-    publishers = Publisher.objects.all()
-    total_new_books = 0
+    # Publishers without a scraper would only produce skipped tasks
+    publisher_ids = list(Publisher.objects.filter(slug__in=list(scraper_paths())).values_list('id', flat=True))
+    if not publisher_ids:
+        logger.warning("No publishers to update")
+        return None
+
+    header = [update_books_for_publisher.s(publisher_id) for publisher_id in publisher_ids]
+    result = chord(header)(summarize_publisher_updates.s())
 
-    for publisher in publishers:
-        result = update_books_for_publisher.delay(publisher.id)
+    logger.info(f"Book update started for {len(publisher_ids)} publishers")
+    return result.id
+
+
+@shared_task
+def remove_outdated_books(publisher_id=None, batch_size=1000):
+    books = Book.objects.outdated()
+    if publisher_id:
+        books = books.filter(publisher_id=publisher_id)
 
-    logger.info(f"Book update started for {len(publishers)} publishers")
-    return total_new_books
\ No newline at end of file
+    deleted = books.delete_in_batches(batch_size)
+    logger.info(f"Removed {deleted} outdated books")
+    return deleted
@@ -1 +1,462 @@
-from django.test import TestCase
+import datetime
+import json
+import re
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .export import export_rows
+from .fetch import FetchDeadlineExceeded
+from .ingest import ingest_books
+from .isbn import normalize_isbn
+from .models import Book, CrawlState, PayloadSnapshot, Publisher
+from .pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .scrapers import OreillyBookScraper
+from .snapshots import find_snapshots, iter_snapshot_products, save_snapshot
+
+
+def make_isbn(number):
+    digits = f'978{number:09d}'
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+# Plan lines that mean the whole book table or one of its indexes is read
+FULL_SCAN = {
+    'sqlite': r'SCAN books_book\b',
+    'postgresql': r'Seq Scan on books_book',
+}
+
+
+@skipUnless(connection.vendor in FULL_SCAN, 'EXPLAIN checks are written for SQLite and PostgreSQL')
+class QueryPlanTests(TestCase):
+    """Guards the hot book queries against regressing to full table scans"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.publisher = Publisher.objects.create(name='Test publisher')
+        today = timezone.now().date()
+        Book.objects.bulk_create([
+            Book(
+                publisher=cls.publisher,
+                title=f'Book {i}',
+                author='Author',
+                book_url=f'https://example.com/books/{i}',
+                isbn=make_isbn(i),
+                isbn13=int(make_isbn(i)),
+                page_count=100 + i * 5,
+                publication_date=today - datetime.timedelta(days=i),
+            )
+            for i in range(200)
+        ])
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables are cheaper to scan; this checks that an index is usable at all
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def book_plans(self, run):
+        """Runs the code under test and returns the plans of the SELECTs it sent for the book table"""
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        plans = [
+            self.explain(query['sql']) for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and '"books_book"' in query['sql']
+        ]
+        self.assertTrue(plans, 'no book queries were captured')
+        return plans
+
+    def assertIndexed(self, run, *indexes, sorted_by_index=False):
+        """Fails if any book query scans the table, or if one of indexes is used by none of them"""
+        plans = self.book_plans(run)
+        for plan in plans:
+            self.assertIsNone(re.search(FULL_SCAN[connection.vendor], plan), plan)
+            if sorted_by_index and connection.vendor == 'sqlite':
+                self.assertNotIn('TEMP B-TREE', plan)
+        for index in indexes:
+            self.assertTrue(any(index in plan for plan in plans), '\n\n'.join(plans))
+
+    def test_ingest_lookup_uses_isbn_and_url_indexes(self):
+        isbn = make_isbn(1)
+        books = [
+            {'title': 'Book 1', 'url': 'https://example.com/other-source/1', 'isbn': f'{isbn[:3]}-{isbn[3:12]}-{isbn[12]}'},
+            {'title': 'New book', 'url': 'https://example.com/books/new', 'isbn': 'not-an-isbn'},
+        ]
+        self.assertIndexed(
+            lambda: ingest_books(self.publisher, books), 'unique_book_isbn13', 'books_book_isbn_54becd_idx',
+        )
+        self.assertEqual(Book.objects.filter(isbn13=int(isbn)).count(), 1)
+
+    def test_outdated_books_use_window_and_short_book_indexes(self):
+        self.assertIndexed(lambda: call_command('remove_outdated_books', '--dry-run', stdout=StringIO()), 'books_book_short_idx')
+        self.assertIndexed(lambda: Book.objects.outdated().delete_in_batches(batch_size=50), 'books_book_short_idx')
+
+    def test_incremental_export_uses_created_at_index(self):
+        since = timezone.now() - datetime.timedelta(hours=1)
+        self.assertIndexed(lambda: list(export_rows(since=since)), 'books_book_created_572b47_idx', sorted_by_index=True)
+
+    def test_keyset_pages_seek_the_publication_date_indexes(self):
+        paginator = KeysetPaginator(Book.objects.all(), 10)
+        page = paginator.page()
+        self.assertIndexed(lambda: paginator.page(page.next_cursor), sorted_by_index=True)
+        self.assertIndexed(lambda: paginator.page(paginator.page(page.next_cursor).previous_cursor), sorted_by_index=True)
+
+        by_publisher = KeysetPaginator(Book.objects.filter(publisher=self.publisher), 10)
+        self.assertIndexed(
+            lambda: by_publisher.page(by_publisher.page().next_cursor), 'books_book_publish_509e24_idx', sorted_by_index=True,
+        )
+
+
+class OutdatedBooksTests(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Manning')
+        self.today = timezone.now().date()
+
+    def make_book(self, number, page_count, days_ago=0):
+        return Book.objects.create(
+            publisher=self.publisher,
+            title=f'Book {number}',
+            author='Author',
+            book_url=f'https://example.com/books/{number}',
+            page_count=page_count,
+            publication_date=self.today - datetime.timedelta(days=days_ago),
+        )
+
+    def test_unknown_page_count_is_not_outdated(self):
+        self.make_book(1, 0)
+        short = self.make_book(2, 150)
+        old = self.make_book(3, 0, days_ago=200)
+        self.assertQuerysetEqual(Book.objects.outdated().order_by('id'), [short, old])
+
+    def test_command_keeps_books_without_page_count(self):
+        self.make_book(1, 0)
+        out = StringIO()
+        call_command('remove_outdated_books', '--yes', stdout=out)
+        self.assertIn('no deletion required', out.getvalue())
+        self.assertEqual(Book.objects.count(), 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BookApiTests(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Manning')
+
+    def test_publishers_with_the_same_name_get_unique_slugs(self):
+        slugs = [self.client.post(reverse('books:publisher-list'), {'name': 'Apress'}).json()['slug'] for _ in range(3)]
+        self.assertEqual(slugs, ['apress', 'apress-2', 'apress-3'])
+
+    def test_non_numeric_publisher_is_rejected(self):
+        response = self.client.get(reverse('books:book-list'), {'publisher': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('publisher', response.json())
+
+    def test_moving_a_book_invalidates_both_publishers(self):
+        other = Publisher.objects.create(name='Packt')
+        book = Book.objects.create(
+            publisher=self.publisher, title='Book', author='Author', book_url='https://example.com/books/1',
+            publication_date=timezone.now().date(),
+        )
+        url = reverse('books:book-list')
+        self.assertEqual(len(self.client.get(url, {'publisher': self.publisher.id}).json()['results']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('books:book-detail', args=[book.id]), {'publisher': other.id}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, {'publisher': self.publisher.id}).json()['results'], [])
+        self.assertEqual(len(self.client.get(url, {'publisher': other.id}).json()['results']), 1)
+
+    def test_moving_a_book_moves_the_publisher_counts(self):
+        other = Publisher.objects.create(name='Packt')
+        today = timezone.now().date()
+        book = Book.objects.create(
+            publisher=self.publisher, title='Book', author='Author', book_url='https://example.com/books/1',
+            publication_date=today,
+        )
+        Book.objects.create(
+            publisher=self.publisher, title='Older book', author='Author', book_url='https://example.com/books/2',
+            publication_date=today - datetime.timedelta(days=5),
+        )
+
+        book = Book.objects.get(pk=book.pk)
+        book.publisher = other
+        book.save()
+
+        self.publisher.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.publisher.book_count, self.publisher.latest_publication_date), (1, today - datetime.timedelta(days=5)))
+        self.assertEqual((other.book_count, other.latest_publication_date), (1, today))
+        self.assertEqual(Publisher.objects.reconcile(), [])
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Manning')
+
+    def record(self, number, **fields):
+        return {
+            'title': f'Book {number}',
+            'authors': 'Author',
+            'url': f'https://example.com/books/{number}',
+            'isbn': make_isbn(number),
+            'page_count': 300,
+            **fields,
+        }
+
+    def test_overlong_values_are_cut_or_skipped(self):
+        books = [
+            self.record(1, title='T' * 300, image_url='https://example.com/' + 'c' * 300),
+            self.record(2, url='https://example.com/' + 'u' * 300),
+        ]
+        new_books = ingest_books(self.publisher, books)
+        self.assertEqual(len(new_books), 1)
+        book = Book.objects.get()
+        self.assertEqual((len(book.title), book.cover_url), (255, ''))
+
+    def test_rejected_record_does_not_fail_the_batch(self):
+        books = [self.record(1), self.record(2, page_count=-5), self.record(3)]
+        new_books = ingest_books(self.publisher, books)
+        self.assertEqual(sorted(book.title for book in new_books), ['Book 1', 'Book 3'])
+        self.assertEqual(Book.objects.count(), 2)
+        self.publisher.refresh_from_db()
+        self.assertEqual(self.publisher.book_count, 2)
+
+    def updates(self, books):
+        """Ingests books and returns the UPDATEs sent, failing if any book was read again row by row"""
+        with CaptureQueriesContext(connection) as queries:
+            ingest_books(self.publisher, books)
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual([query for query in sql if re.search(r'WHERE "books_book"\."id" = \d+', query)], [])
+        return [query for query in sql if query.startswith('UPDATE "books_book"')]
+
+    def test_unchanged_records_are_not_written(self):
+        books = [self.record(1, description='A  book\nabout things'), self.record(2)]
+        ingest_books(self.publisher, books)
+        self.assertEqual(self.updates(books), [])
+        # Whitespace differences do not change the fingerprint
+        self.assertEqual(self.updates([self.record(1, description=' A book about  things ')]), [])
+
+    def test_changed_fingerprint_updates_only_that_book(self):
+        ingest_books(self.publisher, [self.record(1), self.record(2)])
+        self.assertEqual(len(self.updates([self.record(1, description='New description'), self.record(2)])), 1)
+        self.assertEqual(Book.objects.get(isbn=make_isbn(1)).description, 'New description')
+
+    def test_changes_to_different_fields_need_no_query_per_book(self):
+        ingest_books(self.publisher, [self.record(i, description='Description') for i in range(20)])
+        books = [
+            self.record(i, title=f'New title {i}', description='') if i % 2 else self.record(i, description=f'New {i}')
+            for i in range(20)
+        ]
+        self.assertEqual(len(self.updates(books)), 2)
+        self.assertEqual(Book.objects.get(isbn=make_isbn(1)).title, 'New title 1')
+        self.assertEqual(Book.objects.get(isbn=make_isbn(2)).description, 'New 2')
+
+    def test_empty_values_do_not_clear_fields(self):
+        ingest_books(self.publisher, [self.record(1, description='Description')])
+        ingest_books(self.publisher, [self.record(1, title='Renamed', description='')])
+        book = Book.objects.get()
+        self.assertEqual((book.title, book.description), ('Renamed', 'Description'))
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        publisher = Publisher.objects.create(name='Test publisher')
+        today = timezone.now().date()
+        # Three books per date, so pages break inside groups of tied dates
+        Book.objects.bulk_create([
+            Book(
+                publisher=publisher,
+                title=f'Book {i}',
+                author='Author',
+                book_url=f'https://example.com/books/{i}',
+                publication_date=today - datetime.timedelta(days=i // 3),
+            )
+            for i in range(11)
+        ])
+        cls.ordered = list(Book.objects.order_by('-publication_date', 'id').values_list('id', flat=True))
+        cls.paginator = KeysetPaginator(Book.objects.all(), 4)
+
+    def ids(self, page):
+        return [book.id for book in page]
+
+    def test_next_cursors_walk_every_book_once(self):
+        page = self.paginator.page()
+        self.assertFalse(page.has_previous())
+        seen = self.ids(page)
+        while page.has_next():
+            page = self.paginator.page(page.next_cursor)
+            seen += self.ids(page)
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(page), 3)
+
+    def test_last_page_and_previous_cursors_walk_back(self):
+        page = self.paginator.page(KeysetPaginator.last_cursor)
+        self.assertEqual(self.ids(page), self.ordered[-4:])
+        self.assertFalse(page.has_next())
+        seen = self.ids(page)
+        while page.has_previous():
+            page = self.paginator.page(page.previous_cursor)
+            seen = self.ids(page) + seen
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(page), 3)
+
+    def test_previous_then_next_returns_to_the_same_page(self):
+        second = self.paginator.page(self.paginator.page().next_cursor)
+        first = self.paginator.page(second.previous_cursor)
+        self.assertEqual(self.ids(first), self.ordered[:4])
+        self.assertFalse(first.has_previous())
+        self.assertEqual(self.ids(self.paginator.page(first.next_cursor)), self.ids(second))
+
+    def test_cursor_round_trip(self):
+        position = (datetime.date(2026, 10, 1), 42)
+        self.assertEqual(decode_cursor(encode_cursor(position, reverse=True)), (True, position))
+        self.assertEqual(decode_cursor(KeysetPaginator.first_cursor), (False, None))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor')
+
+
+class NormalizeIsbnTests(SimpleTestCase):
+    def test_notations_of_the_same_book_match(self):
+        for value in ('9780306406157', '978-0-306-40615-7', 'ISBN 978 0 306 40615 7', '0306406152', '0-306-40615-2'):
+            self.assertEqual(normalize_isbn(value), 9780306406157, value)
+
+    def test_isbn10_with_x_check_digit(self):
+        self.assertEqual(normalize_isbn('0-8044-2957-X'), 9780804429573)
+        self.assertEqual(normalize_isbn('080442957x'), 9780804429573)
+
+    def test_979_prefix_is_kept(self):
+        self.assertEqual(normalize_isbn('979-10-00000-00-8'), 9791000000008)
+
+    def test_invalid_values(self):
+        for value in (None, '', '9780306406158', '0306406153', '9770306406158', '12345', '978030640615', 'not an isbn'):
+            self.assertIsNone(normalize_isbn(value), value)
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.url = ''
+        self.headers = {}
+
+
+class SearchPageFetcher:
+    """Serves lists of products as consecutive pages of the O'Reilly search API; an exception in place of a page is raised"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    async def get(self, url, params=None, headers=None):
+        page = params['page']
+        self.requested.append(page)
+        products = self.pages[page] if page < len(self.pages) else []
+        if isinstance(products, Exception):
+            raise products
+        return FakeResponse(json.dumps({'data': {'products': products}}).encode())
+
+    async def get_if_changed(self, url, **kwargs):
+        return None, None
+
+
+class OreillyCrawlTests(TestCase):
+    def setUp(self):
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        snapshot_settings = override_settings(BOOK_SNAPSHOT_DIR=snapshot_dir.name)
+        snapshot_settings.enable()
+        self.addCleanup(snapshot_settings.disable)
+
+        self.publisher = Publisher.objects.create(name="O'Reilly Media", slug='oreilly')
+        self.scraper = OreillyBookScraper()
+        self.scraper.params = {**OreillyBookScraper.params, 'rows': 2}
+        self.created = {n: timezone.now() - datetime.timedelta(hours=10 - n) for n in range(1, 6)}
+        # Newest first, two products per page
+        self.fetcher = SearchPageFetcher([[self.product(5), self.product(4)], [self.product(3), self.product(2)], [self.product(1)]])
+
+    def product(self, number):
+        isbn = make_isbn(number)
+        return {
+            'type': 'book',
+            'title': f'Book {number}',
+            'url': f'https://learning.oreilly.com/library/view/book-{number}/{isbn}/',
+            'created_at': self.created[number].isoformat(),
+            'authors': ['Author'],
+            'custom_attributes': {
+                'publisher_details': [{'name': "O'Reilly Media, Inc."}],
+                'page_count': 300,
+                'publication_date': timezone.now().date().isoformat(),
+            },
+        }
+
+    def crawl(self, limit=None):
+        return async_to_sync(self.scraper.aget_latest_books)(self.publisher, limit, fetcher=self.fetcher)
+
+    def test_crawl_stops_at_the_watermark_and_commits_it_once_saved(self):
+        CrawlState.objects.create(publisher=self.publisher, last_seen_created_at=self.created[2], last_seen_isbn=make_isbn(2))
+
+        books = self.crawl()
+        self.assertEqual([book['title'] for book in books], ['Book 5', 'Book 4', 'Book 3'])
+        self.assertEqual(self.fetcher.requested, [0, 1])
+        self.assertEqual(books.watermark, (self.created[5], make_isbn(5)))
+        # Nothing is committed until the books are saved
+        self.assertEqual(CrawlState.objects.get().last_seen_isbn, make_isbn(2))
+
+        self.scraper.save_books(self.publisher, books)
+        state = CrawlState.objects.get()
+        self.assertEqual((state.last_seen_created_at, state.last_seen_isbn), (self.created[5], make_isbn(5)))
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_truncated_crawl_keeps_the_watermark(self):
+        books = self.crawl(limit=1)
+        self.assertEqual(len(books), 1)
+        self.assertIsNone(books.watermark)
+
+        self.scraper.save_books(self.publisher, books)
+        self.assertIsNone(CrawlState.objects.get().last_seen_created_at)
+
+    def test_failed_later_page_keeps_the_books_already_parsed(self):
+        self.fetcher.pages[1] = FetchDeadlineExceeded('Deadline exceeded')
+
+        books = self.crawl()
+        self.assertEqual([book['title'] for book in books], ['Book 5', 'Book 4'])
+        self.assertEqual(self.fetcher.requested, [0, 1])
+        self.assertIsNone(books.watermark)
+
+    def test_failed_first_page_falls_back_to_rss(self):
+        self.fetcher.pages[0] = FetchDeadlineExceeded('Deadline exceeded')
+        self.assertEqual(list(self.crawl()), [])
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        snapshot_settings = override_settings(BOOK_SNAPSHOT_DIR=snapshot_dir.name)
+        snapshot_settings.enable()
+        self.addCleanup(snapshot_settings.disable)
+        self.publisher = Publisher.objects.create(name="O'Reilly Media", slug='oreilly')
+
+    def test_refetched_payload_keeps_one_index_row(self):
+        payload = json.dumps({'data': {'products': [{'title': 'Book'}]}})
+        first = save_snapshot(self.publisher, payload, 'https://example.com/page0')
+        second = save_snapshot(self.publisher, payload, 'https://example.com/page0?again')
+        save_snapshot(Publisher.objects.create(name='Manning'), payload)
+
+        self.assertEqual(second.pk, first.pk)
+        self.assertGreater(second.created_at, first.created_at)
+        self.assertEqual(PayloadSnapshot.objects.count(), 2)
+        snapshots = find_snapshots([self.publisher])
+        self.assertEqual([snapshot.source_url for snapshot in snapshots], ['https://example.com/page0?again'])
+        self.assertEqual(list(iter_snapshot_products(snapshots)), [{'title': 'Book'}])
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookViewSet, PublisherViewSet, BookListView, PublisherListView, OreillySummaryView
+from .views import BookViewSet, PublisherViewSet, BookListView, OreillyBooksView, PublisherListView, OreillySummaryView, BookExportView
 
 app_name = 'books'
 
@@ -14,4 +14,6 @@ urlpatterns = [
     path('', BookListView.as_view(), name='book_list'),
     path('publishers/', PublisherListView.as_view(), name='publisher_list'),
     path('oreilly/', OreillySummaryView.as_view(), name='oreilly_summary'),
+    path('oreilly/books/', OreillyBooksView.as_view(), name='oreilly_books'),
+    path('export/', BookExportView.as_view(), name='book_export'),
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+import calendar
+from datetime import datetime, timezone
+
+MIN_PAGE_COUNT = 200
+
+
+def shift_months(day, months):
+    """Moves a date by whole months, clamping the day to the length of the target month"""
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def publication_window(today=None):
+    """Returns the (three months past, one month future) range of publication dates we keep"""
+    today = today or datetime.now(timezone.utc).date()
+    return shift_months(today, -3), shift_months(today, 1)
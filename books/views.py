@@ -1,21 +1,29 @@
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render
-from django.views.generic import ListView, DetailView
+from django.views.generic import ListView, DetailView, View
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from . import metrics
+from .cache import CachedResponseMixin
+from .export import FORMATS, export_rows, iter_export, parse_since
 from .models import Publisher, Book
-from .serializers import PublisherSerializer, BookSerializer
+from .pagination import BookCursorPagination, KeysetPaginationMixin
+from .serializers import PublisherSerializer, BookSerializer, BookReadSerializer
+from .search import FullTextSearchFilter, search_books
 from .tasks import update_books_for_publisher
-from django.db import models
-from django.db.models import Count
 
 
-class PublisherViewSet(viewsets.ModelViewSet):
+class PublisherViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Publisher.objects.all()
     serializer_class = PublisherSerializer
 
+    def get_cache_publishers(self, request, *args, **kwargs):
+        pk = kwargs.get('pk')
+        return [int(pk)] if pk and pk.isdigit() else None
+
     @action(detail=True, methods=['post'])
     def update_books(self, request, pk=None):
         publisher = self.get_object()
@@ -23,19 +31,52 @@ class PublisherViewSet(viewsets.ModelViewSet):
         return Response({'status': 'Task started', 'task_id': str(task.id)})
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all().order_by('-publication_date')
     serializer_class = BookSerializer
+    filter_backends = [FullTextSearchFilter]
+    pagination_class = BookCursorPagination
+    # Pages are ordered by publication date, so search relevance ranking would be discarded
+    search_ranked = False
+    # Reads skip model instances and ModelSerializer fields; writes keep the full serializer
+    read_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        publisher_id = self.request.query_params.get('publisher')
+        if publisher_id:
+            if not publisher_id.isdigit():
+                raise ValidationError({'publisher': 'Expected a publisher id.'})
+            queryset = queryset.filter(publisher_id=publisher_id)
+
+        if self.action in self.read_actions:
+            return queryset.values(*BookReadSerializer.columns.values())
+        return queryset.select_related('publisher')
+
+    def get_serializer_class(self):
+        if self.action in self.read_actions:
+            return BookReadSerializer
+        return BookSerializer
+
+    def get_cache_publishers(self, request, *args, **kwargs):
+        publisher_id = request.query_params.get('publisher')
+        if publisher_id and publisher_id.isdigit() and 'pk' not in kwargs:
+            return [int(publisher_id)]
+        return None
+
+
+# Columns rendered by the book card templates
+CARD_FIELDS = ('title', 'author', 'cover_url', 'description', 'book_url', 'publication_date', 'isbn')
 
 
-class BookListView(ListView):
+class BookListView(KeysetPaginationMixin, ListView):
     model = Book
     template_name = 'books/book_list.html'
     context_object_name = 'books'
     paginate_by = 10
 
     def get_queryset(self):
-        queryset = Book.objects.all().order_by('-publication_date')
+        queryset = Book.objects.with_publisher(*CARD_FIELDS).order_by('-publication_date')
 
         publisher_id = self.request.GET.get('publisher')
         if publisher_id:
@@ -43,13 +84,13 @@ class BookListView(ListView):
 
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(title__icontains=search_query)
+            queryset = search_books(queryset, search_query, ranked=False)
 
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['publishers'] = Publisher.objects.annotate(book_count=Count('books'))
+        context['publishers'] = Publisher.objects.all()
 
         publisher_id = self.request.GET.get('publisher')
         if publisher_id:
@@ -69,7 +110,7 @@ class BookDetailView(DetailView):
     context_object_name = 'book'
 
 
-class OreillyBooksView(ListView):
+class OreillyBooksView(KeysetPaginationMixin, ListView):
     model = Book
     template_name = 'books/oreilly_books.html'
     context_object_name = 'books'
@@ -77,16 +118,12 @@ class OreillyBooksView(ListView):
 
     def get_queryset(self):
         try:
-            oreilly = Publisher.objects.get(name="O'Reilly Media")
-            queryset = Book.objects.filter(publisher=oreilly).order_by('-publication_date')
+            oreilly = Publisher.objects.get(slug='oreilly')
+            queryset = Book.objects.with_publisher(*CARD_FIELDS).filter(publisher=oreilly).order_by('-publication_date')
 
             search_query = self.request.GET.get('q')
             if search_query:
-                queryset = queryset.filter(
-                    models.Q(title__icontains=search_query) |
-                    models.Q(author__icontains=search_query) |
-                    models.Q(description__icontains=search_query)
-                )
+                queryset = search_books(queryset, search_query, ranked=False)
 
             return queryset
         except Publisher.DoesNotExist:
@@ -97,7 +134,7 @@ class OreillyBooksView(ListView):
         context['publishers'] = Publisher.objects.all()
         context['search_query'] = self.request.GET.get('q', '')
         try:
-            context['oreilly'] = Publisher.objects.get(name="O'Reilly Media")
+            context['oreilly'] = Publisher.objects.get(slug='oreilly')
         except Publisher.DoesNotExist:
             pass
         return context
@@ -109,7 +146,7 @@ class PublisherListView(ListView):
     context_object_name = 'publishers'
 
     def get_queryset(self):
-        return Publisher.objects.annotate(book_count=Count('books')).order_by('name')
+        return Publisher.objects.order_by('name')
 
 
 class OreillySummaryView(ListView):
@@ -117,9 +154,46 @@ class OreillySummaryView(ListView):
     context_object_name = 'books'
 
     def get_queryset(self):
-        return Book.objects.filter(publisher__name__contains="O'Reilly").order_by('-publication_date')
+        return Book.objects.filter(publisher__slug='oreilly').order_by('-publication_date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['publishers'] = Publisher.objects.filter(name__contains="O'Reilly")
+        context['publishers'] = Publisher.objects.filter(slug='oreilly')
         return context
+
+
+class BookExportView(View):
+    """Streams the catalog as NDJSON or CSV (?format=), optionally filtered by ?publisher= and ?since="""
+
+    def get(self, request):
+        export_format = request.GET.get('format', 'ndjson')
+        if export_format not in FORMATS:
+            return HttpResponseBadRequest(f"Unsupported format, use one of: {', '.join(FORMATS)}")
+
+        publisher_ids = request.GET.getlist('publisher')
+        if not all(publisher_id.isdigit() for publisher_id in publisher_ids):
+            return HttpResponseBadRequest("publisher must be a publisher id")
+
+        since = None
+        if request.GET.get('since'):
+            try:
+                since = parse_since(request.GET['since'])
+            except ValueError as e:
+                return HttpResponseBadRequest(str(e))
+
+        response = StreamingHttpResponse(
+            iter_export(export_rows(publisher_ids, since), export_format),
+            content_type=FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        return response
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint"""
+
+    def get(self, request):
+        if metrics.prometheus_client is None:
+            return HttpResponse("prometheus_client is not installed\n", status=501, content_type='text/plain')
+        body, content_type = metrics.exposition()
+        return HttpResponse(body, content_type=content_type)
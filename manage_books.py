@@ -7,7 +7,9 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookmonitor.settings')
 django.setup()
 
 from books.models import Publisher
-from books.tasks import update_books_for_publisher
+from books.registry import get_scraper_for_publisher
+from books.scrapers import fetch_latest_books
+from asgiref.sync import async_to_sync
 from django.db import transaction
 
 
@@ -15,18 +17,21 @@ def add_publishers():
     publishers_data = [
         {
             'name': "O'Reilly Media",
+            'slug': 'oreilly',
             'description': "One of the most well-known publishers in computer literature. Popular series: Head First, Animal Guide (books with animals on covers).",
             'website': "https://www.oreilly.com/",
             'logo_url': "https://cdn.oreillystatic.com/images/sitewide-headers/oreilly_logo_mark_red.svg",
         },
         {
             'name': "Manning Publications",
+            'slug': 'manning',
             'description': "Known for its books on programming and software development. Popular series: In Action, In Depth.",
             'website': "https://www.manning.com/",
             'logo_url': "https://images.manning.com/logo-dark.svg",
         },
         {
             'name': "Packt Publishing",
+            'slug': 'packt',
             'description': "Publishes books on a wide range of technologies, including programming, DevOps, machine learning, and cloud technologies.",
             'website': "https://www.packtpub.com/",
             'logo_url': "https://static.packt-cdn.com/images/logo-big.png",
@@ -79,10 +84,24 @@ def add_publishers():
 
 def update_all_books():
     publishers = Publisher.objects.all()
+    scrapers = []
     for publisher in publishers:
-        print(f"Starting book update for publisher: {publisher.name}")
-        update_books_for_publisher(publisher.id)
-    print(f"Book update started for {publishers.count()} publishers")
+        scraper = get_scraper_for_publisher(publisher)
+        if scraper:
+            print(f"Starting book update for publisher: {publisher.name}")
+            scrapers.append((publisher, scraper))
+        else:
+            print(f"Scraper for publisher {publisher.name} not found")
+
+    results = async_to_sync(fetch_latest_books)([(scraper, publisher) for publisher, scraper in scrapers], limit=None)
+
+    for (publisher, scraper), books_data in zip(scrapers, results):
+        try:
+            new_books = scraper.save_books(publisher, books_data)
+            print(f"Added {len(new_books)} new books from {publisher.name}")
+        except Exception as e:
+            print(f"Error saving books from {publisher.name}: {e}")
+    print(f"Book update finished for {len(scrapers)} publishers")
 
 
 if __name__ == "__main__":